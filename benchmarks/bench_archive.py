@@ -0,0 +1,71 @@
+"""Time NSArchivedPlist.load and dump on synthetic keyed archives of growing size.
+
+Each archive is a gradient-style colour stop list, the shape that makes
+layer-style snapshots large. If decoding and encoding are linear, the time
+per object stays flat as the archive grows. The dump() / load() round
+trip itself is tested in tests/test_archive.py.
+
+    python benchmarks/bench_archive.py [n_objects ...]
+"""
+from __future__ import print_function, unicode_literals
+import os.path
+import sys
+import timeit
+
+import biplist
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import libpxm
+
+
+def make_stop_list_archive(n_stops):
+    # $objects layout: $null, root dict, class entries, shared keys, then 3 objects per stop.
+    objects = ['$null', None,
+               {'$classname': 'NSDictionary', '$classes': ['NSDictionary', 'NSObject']},
+               {'$classname': 'NSArray', '$classes': ['NSArray', 'NSObject']},
+               {'$classname': 'NSData', '$classes': ['NSData', 'NSObject']},
+               'PTGradientColorStopListKey',
+               'PTGradientColorStopLocationKey',
+               'PTGradientColorStopColorKey',
+               None]
+    dict_cls, array_cls, data_cls = biplist.Uid(2), biplist.Uid(3), biplist.Uid(4)
+    list_key, loc_key, color_key = biplist.Uid(5), biplist.Uid(6), biplist.Uid(7)
+
+    stop_uids = []
+    for i in range(n_stops):
+        base = len(objects)
+        objects.append({'NS.keys': [loc_key, color_key],
+                        'NS.objects': [biplist.Uid(base + 1), biplist.Uid(base + 2)],
+                        '$class': dict_cls})
+        objects.append(float(i) / max(n_stops, 1))
+        objects.append({'NS.data': b'PTCGC' + bytes(bytearray(35)), '$class': data_cls})
+        stop_uids.append(biplist.Uid(base))
+
+    objects[8] = {'NS.objects': stop_uids, '$class': array_cls}
+    objects[1] = {'NS.keys': [list_key], 'NS.objects': [biplist.Uid(8)], '$class': dict_cls}
+
+    return {'$archiver': 'NSKeyedArchiver', '$version': 100000,
+            '$top': {'root': biplist.Uid(1)}, '$objects': objects}
+
+
+def main(argv):
+    sizes = [int(a) for a in argv] or [1000, 10000, 100000]
+    print('{0:>10} {1:>12} {2:>12} {3:>14} {4:>14}'.format(
+        'objects', 'load (ms)', 'dump (ms)', 'load us / obj', 'dump us / obj'))
+    for n_objects in sizes:
+        arc = make_stop_list_archive(max(n_objects // 3, 1))
+        n_actual = len(arc['$objects'])
+        real_plist = libpxm.NSArchivedPlist.load(arc).real_plist
+        assert len(real_plist['PTGradientColorStopListKey']) == (n_actual - 9) // 3
+        # Shared keys and class entries are archived once, so the encoded table is no larger than the input.
+        assert len(libpxm.NSArchivedPlist.dump(real_plist).arc_plist['$objects']) <= n_actual
+
+        runs = 5
+        load_best = min(timeit.repeat(lambda: libpxm.NSArchivedPlist.load(arc), number=1, repeat=runs))
+        dump_best = min(timeit.repeat(lambda: libpxm.NSArchivedPlist.dump(real_plist), number=1, repeat=runs))
+        print('{0:>10} {1:>12.2f} {2:>12.2f} {3:>14.3f} {4:>14.3f}'.format(
+            n_actual, load_best * 1e3, dump_best * 1e3, load_best * 1e6 / n_actual, dump_best * 1e6 / n_actual))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,60 @@
+"""Check that `import libpxm` stays within its start-up budget.
+
+Each run starts a fresh interpreter. The cost of the import is the best
+time of `import libpxm` minus the best time of an empty interpreter. The
+import must also not pull in the heavy modules that the submodules load on
+first use. Exits non-zero if the budget is exceeded.
+
+    python benchmarks/bench_import.py [--budget-ms MS] [--runs N]
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import os.path
+import subprocess
+import sys
+import time
+
+__author__ = 'Ethan Randall'
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+LAZY_MODULES = ('biplist', 'sqlite3', 'tempfile', 'uuid', 'numpy', 'multiprocessing', 'libpxm.document')
+
+
+def best_run_time(code, runs):
+    times = []
+    for _ in range(runs):
+        t0 = time.time()
+        subprocess.check_call([sys.executable, '-c', code], cwd=ROOT)
+        times.append(time.time() - t0)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Enforce the libpxm import-time budget.')
+    parser.add_argument('--budget-ms', type=float, default=15.0, help='allowed import cost in milliseconds')
+    parser.add_argument('--runs', type=int, default=20, help='interpreter starts per measurement')
+    args = parser.parse_args(argv)
+
+    loaded = subprocess.check_output(
+        [sys.executable, '-c', 'import sys, libpxm; libpxm.PXMLayerTypes; '
+                               'print(" ".join(m for m in %r if m in sys.modules))' % (LAZY_MODULES,)],
+        cwd=ROOT).decode('utf-8').split()
+
+    baseline = best_run_time('pass', args.runs)
+    with_import = best_run_time('import libpxm; libpxm.PXMLayerTypes', args.runs)
+    cost_ms = max(with_import - baseline, 0.0) * 1e3
+    print('interpreter start %.1f ms, import libpxm +%.1f ms (budget %.1f ms)'
+          % (baseline * 1e3, cost_ms, args.budget_ms))
+
+    failed = False
+    if loaded:
+        print('imported eagerly: %s' % ', '.join(loaded))
+        failed = True
+    if cost_ms > args.budget_ms:
+        print('over budget')
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""Benchmark libpxm stages on synthetic documents and print the results as JSON.
+
+Each case writes a document with benchmarks/synth.py and times, best of
+`--repeat` runs: a full open, a header-only read, layer enumeration, trait
+plist decoding and pixel extraction. Keep the output of a known-good
+revision and compare later runs against it to catch regressions.
+
+    python benchmarks/run.py [--repeat N] [--output results.json] [case ...]
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import json
+import os.path
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import libpxm
+from synth import write_synthetic_pxm
+
+__author__ = 'Ethan Randall'
+
+# name: (n_layers, n_stops, bitmap_side)
+CASES = {
+    'small': (10, 2, 64),
+    'many-layers': (500, 2, 16),
+    'complex-styles': (50, 200, 32),
+    'large-bitmaps': (8, 2, 1024),
+}
+
+
+def open_document(pxm_fp1):
+    return libpxm.PXMFileReader(pxm_fp1).pmx_fo
+
+
+def enumerate_layers(pxm_fp1):
+    return [l1.name for l1 in libpxm.PXMFileReader(pxm_fp1, load_layers=False).pmx_fo.iter_layers(
+        columns=('PTImageIOFormatLayerNameInfoKey',))]
+
+
+def decode_traits(pxm_fp1):
+    libpxm.archive_cache.clear()
+    return [l1.trait_plist for l1 in open_document(pxm_fp1).layers]
+
+
+def extract_pixels(pxm_fp1):
+    return [l1.pixels().sum() for l1 in open_document(pxm_fp1).layers if l1.type == libpxm.PXMLayerTypes.bitmap]
+
+
+STAGES = [
+    ('open', open_document),
+    ('header_only', libpxm.read_header),
+    ('enumerate_layers', enumerate_layers),
+    ('decode_traits', decode_traits),
+    ('extract_pixels', extract_pixels),
+]
+
+
+def best_time(func, arg, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.time()
+        func(arg)
+        times.append(time.time() - t0)
+    return min(times)
+
+
+def run_case(name, n_layers, n_stops, bitmap_side, work_dir, repeat):
+    pxm_fp1 = write_synthetic_pxm(os.path.join(work_dir, name + '.pxm'), n_layers, n_stops, bitmap_side)
+    return {
+        'case': name,
+        'params': {'n_layers': n_layers, 'n_stops': n_stops, 'bitmap_side': bitmap_side},
+        'file_bytes': os.path.getsize(pxm_fp1),
+        'seconds': dict((stage, best_time(func, pxm_fp1, repeat)) for stage, func in STAGES),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time libpxm on synthetic .pxm documents.')
+    parser.add_argument('cases', nargs='*', help='Cases to run, from %s (default: all).' % ', '.join(sorted(CASES)))
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per stage; the best time is kept.')
+    parser.add_argument('--output', help='Write the JSON here instead of stdout.')
+    args = parser.parse_args(argv)
+    for name in args.cases:
+        if name not in CASES:
+            parser.error('unknown case %r' % name)
+
+    work_dir = tempfile.mkdtemp(prefix='pxm-bench-')
+    try:
+        results = [run_case(name, *CASES[name], work_dir=work_dir, repeat=args.repeat)
+                   for name in (args.cases or sorted(CASES))]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {'python': platform.python_version(), 'platform': platform.platform(), 'repeat': args.repeat,
+              'results': results}
+    if args.output:
+        with open(args.output, 'w') as out_fd:
+            json.dump(report, out_fd, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""Write synthetic but structurally valid .pxm documents for benchmarking.
+
+A document has the PXMDMETA header plist, the document/info container
+entry and an SQLite database with document_info, document_layer and
+layer_info. Each layer gets the usual layer_info keys, a keyed-archive
+layer style with a gradient of `n_stops` colour stops, and (for bitmap
+layers) an uncompressed RGBA bitmap.
+
+    python benchmarks/synth.py out.pxm [n_layers] [n_stops] [bitmap_side]
+"""
+from __future__ import print_function, unicode_literals
+import os
+import random
+import sqlite3
+import struct
+import sys
+import tempfile
+import uuid
+import zlib
+
+import biplist
+
+__author__ = 'Ethan Randall'
+
+BITMAP = 'com.pixelmatorteam.pixelmator.layer.bitmap'
+VECTOR = 'com.pixelmatorteam.pixelmator.layer.vector'
+
+# sRGB-sized stand-in for the ICC profiles Pixelmator embeds; only the size field in its header is meaningful.
+FAKE_ICC = struct.pack('>I4s', 3144, b'Lino') + b'\x00' * (3144 - 8)
+
+
+class NSValueSize(tuple):
+    """A (w, h) tuple archived as an NSValue size string."""
+
+
+def keyed_archive(root):
+    """A minimal NSKeyedArchiver encoding of dicts, lists, strings, numbers, Data and NSValueSize."""
+    objects = ['$null']
+    classes = {}
+
+    def class_uid(name):
+        if name not in classes:
+            objects.append({'$classname': name, '$classes': [name, 'NSObject']})
+            classes[name] = biplist.Uid(len(objects) - 1)
+        return classes[name]
+
+    def add(value):
+        i = len(objects)
+        objects.append(None)
+        if isinstance(value, dict):
+            keys = [add(k) for k in value]
+            vals = [add(v) for v in value.values()]
+            objects[i] = {'NS.keys': keys, 'NS.objects': vals, '$class': class_uid('NSDictionary')}
+        elif isinstance(value, list):
+            objects[i] = {'NS.objects': [add(v) for v in value], '$class': class_uid('NSArray')}
+        elif isinstance(value, NSValueSize):
+            objects[i] = {'NS.special': 2, 'NS.sizeval': add('{%s, %s}' % value), '$class': class_uid('NSValue')}
+        else:
+            objects[i] = value
+        return biplist.Uid(i)
+
+    top = add(root)
+    return biplist.writePlistToString({'$archiver': 'NSKeyedArchiver', '$version': 100000,
+                                       '$top': {'root': top}, '$objects': objects})
+
+
+def ptcgc_color(rgba):
+    """A PTCGC colour blob: sRGB components plus alpha, native components, then an ICC profile."""
+    return biplist.Data(b'PTCGC\x00' + struct.pack('<III', 1, 0, 3) + struct.pack('>4d', *rgba) +
+                        struct.pack('<I', 4) + struct.pack('>4d', *rgba) +
+                        struct.pack('<I', len(FAKE_ICC)) + FAKE_ICC)
+
+
+def layer_style(rng, n_stops, doc_size):
+    stops = [{'PTGradientColorStopColorKey': ptcgc_color((rng.random(), rng.random(), rng.random(), 1.0)),
+              'PTGradientColorStopLocationKey': float(i) / max(n_stops - 1, 1)} for i in range(n_stops)]
+    snapshot = {
+        'PTLayerStyleBlendModeKey': 1852797549,
+        'PTLayerStyleDocumentSizeKey': NSValueSize(doc_size),
+        'PTLayerStyleShadowKey': {'PTLayerStyleShadowAngleKey': 4.71238898038469,
+                                  'PTLayerStyleShadowBlurKey': 2,
+                                  'PTLayerStyleColorKey': ptcgc_color((0.0, 0.0, 0.0, 0.5))},
+        'PTLayerStyleFillKey': {'PTLayerStyleFillModeKey': 1,
+                                'PTLayerStyleColorKey': ptcgc_color((1.0, 1.0, 1.0, 1.0)),
+                                'PTLayerStyleGradientKey': {'PTGradientTypeKey': 0,
+                                                            'PTGradientColorStopListKey': stops}},
+    }
+    state = keyed_archive({'PTLayerIsLockedCustomInfoKey': False})
+    return keyed_archive({'_IS_STYLE_LAYER_': 'YES', 'LAYER_OPTIONS': 1,
+                          'PTLayerStyleSnapshotKey': snapshot, '_STATE_DATA_': biplist.Data(state)})
+
+
+def build_database(db_fp, n_layers, n_stops, bitmap_side, rng):
+    doc_size = (bitmap_side, bitmap_side)
+    conn = sqlite3.connect(db_fp)
+    conn.execute('CREATE TABLE document_info (name TEXT, value BLOB);')
+    conn.execute('CREATE TABLE document_layer (layer_uuid TEXT, parent_uuid TEXT, index_at_parent INTEGER, type TEXT);')
+    conn.execute('CREATE TABLE layer_info (layer_uuid TEXT, name TEXT, value BLOB);')
+    conn.executemany('INSERT INTO document_info VALUES (?, ?);', [
+        ('PTImageIOFormatDocumentIDInfoKey', str(uuid.UUID(int=rng.getrandbits(128))).upper()),
+        ('PTImageIOFormatDocumentSizeInfoKey', '{%d, %d}' % doc_size),
+        ('PTImageIOFormatDocumentResolutionSizeInfoKey', '{72, 72}'),
+        ('PTImageIOFormatDocumentResolutionUnitsInfoKey', '1'),
+        ('PTImageIOFormatDocumentBitsPerComponentInfoKey', '8'),
+        ('PTImageIOFormatDocumentNumberOfComponentsInfoKey', '4'),
+        ('PTImageIOFormatDocumentBitmapDataFormatInfoKey', '266760'),
+        ('PTImageIOFormatDocumentSaveDateInfoKey', '466000000.5'),
+        ('PTImageIOFormatDocumentColorsyncProfileInfoKey', sqlite3.Binary(FAKE_ICC)),
+        ('PTImageIOFormatDocumentKeywordsInfoKey', sqlite3.Binary(keyed_archive(['synthetic']))),
+    ])
+
+    names = []
+    for i in range(n_layers):
+        layer_uuid = str(uuid.UUID(int=rng.getrandbits(128))).upper()
+        is_vector = i % 5 == 4
+        names.append('Layer %d' % i)
+        conn.execute('INSERT INTO document_layer VALUES (?, ?, ?, ?);',
+                     (layer_uuid, None, i, VECTOR if is_vector else BITMAP))
+        info = [
+            ('PTImageIOFormatLayerNameInfoKey', names[-1]),
+            ('PTImageIOFormatLayerOpacityInfoKey', '1'),
+            ('PTImageIOFormatLayerBlendModeInfoKey', '1852797549'),
+            ('PTImageIOFormatLayerIsVisibleInfoKey', '1'),
+            ('PTImageIOFormatLayerIsClippingMaskInfoKey', '0'),
+            ('PTImageIOFormatLayerOriginInfoKey', '{0, 0}'),
+            ('PTImageIOFormatLayerSizeInfoKey', '{%d, %d}' % doc_size),
+            ('PTImageIOFormatLayerHasBitmapDataInfoKey', '0' if is_vector else '1'),
+            ('PTImageIOFormatLayerBitmapDataChangeTimestampInfoKey', '%f' % (466000000 + i)),
+            ('PTImageIOFormatLayerSpecificDataInfoKey', sqlite3.Binary(layer_style(rng, n_stops, doc_size))),
+        ]
+        if not is_vector:
+            pixels = bytes(bytearray(rng.getrandbits(8) for _ in range(64))) * (bitmap_side * bitmap_side * 4 // 64 + 1)
+            info.append(('PTImageIOFormatLayerBitmapDataInfoKey',
+                         sqlite3.Binary(pixels[:bitmap_side * bitmap_side * 4])))
+        conn.executemany('INSERT INTO layer_info VALUES (?, ?, ?);', [(layer_uuid, k, v) for k, v in info])
+
+    conn.commit()
+    conn.close()
+    return names, doc_size
+
+
+def write_synthetic_pxm(pxm_fp, n_layers=10, n_stops=2, bitmap_side=64, seed=0):
+    """Write a synthetic document to `pxm_fp` and return its path."""
+    rng = random.Random(seed)
+    fd, db_fp = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.remove(db_fp)
+    try:
+        names, doc_size = build_database(db_fp, n_layers, n_stops, bitmap_side, rng)
+        with open(db_fp, 'rb') as db_fd:
+            db_bytes = db_fd.read()
+    finally:
+        os.remove(db_fp)
+
+    header = keyed_archive({
+        'PTImageIOFormatBasicMetaLayerNamesInfoKey': names,
+        'PTImageIOFormatBasicMetaDocumentSizeInfoKey': NSValueSize(doc_size),
+        'PTImageIOFormatBasicMetaVectorLayersCountInfoKey': sum(1 for i in range(n_layers) if i % 5 == 4),
+        'PTImageIOFormatBasicMetaKeywordsInfoKey': ['synthetic'],
+        'PTImageIOFormatBasicMetaVersionInfoKey': {'PTImageIOPlatformMacOS': {'version': '3.3'}},
+    })
+    entry_name = b'document/info'
+    local_header = struct.pack('<4sHHHHHIIIHH', b'PK\x03\x04', 20, 0, 0, 0, 0, zlib.crc32(db_bytes) & 0xFFFFFFFF,
+                               len(db_bytes), len(db_bytes), len(entry_name), 0) + entry_name
+
+    with open(pxm_fp, 'wb') as pxm_fd:
+        pxm_fd.write(b'PXMDMETA' + struct.pack('<i', len(header)) + header + local_header + db_bytes)
+    return pxm_fp
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if not args:
+        print(__doc__.strip().splitlines()[-1].strip())
+        sys.exit(2)
+    write_synthetic_pxm(args[0], *[int(a) for a in args[1:4]])
@@ -0,0 +1,70 @@
+"""Read and write Pixelmator .pxm documents.
+
+Importing the package is cheap: submodules (and biplist, sqlite3, numpy)
+are only imported when one of their names is first used, e.g.
+libpxm.PXMFileReader loads libpxm.document. PXMLayerTypes is defined here.
+"""
+from __future__ import print_function, unicode_literals
+from collections import namedtuple
+import sys
+
+__author__ = 'Ethan Randall'
+
+
+PXMLayerTypes = namedtuple('PXMLayerTypes',
+                           ['bitmap', 'vector']
+                           )('com.pixelmatorteam.pixelmator.layer.bitmap',
+                             'com.pixelmatorteam.pixelmator.layer.vector')
+
+#  'bitmap' / full type string -> the one shared PXMLayerTypes member
+_LAYER_TYPES = dict(zip(PXMLayerTypes._fields, PXMLayerTypes))
+_LAYER_TYPES.update((t, t) for t in PXMLayerTypes)
+
+
+#  public name -> submodule it lives in
+_SUBMODULE_NAMES = {
+    'geometry': ['parse_geometry_string', 'format_geometry_string'],
+    'profile': ['PXMProfile'],
+    'archive': ['NSColor', 'NSRGB', 'NSComponents', 'NSArchivedPlist', 'FrozenDict', 'FrozenList', 'freeze', 'thaw',
+                'PXMArchiveCache', 'archive_cache', 'BPlistReader', 'BPlistArray', 'BPlistDict'],
+    'header': ['PXMHeader', 'read_header', 'read_header_archive'],
+    'container': ['PXMSection', 'PXMContainer'],
+    'sqldb': ['PXMSqlDB', 'PXMDecodeCache'],
+    'layers': ['PXMLayerTraits', 'PXMLayer'],
+    'pixels': ['PXMCompositor'],
+    'color': ['PXMColor', 'PXMColorDecoder', 'document_colors', 'PXMICCProfile', 'PXMProfileStore', 'icc_profiles'],
+    'document': ['PXMFile', 'PXMFileReader', 'PXMFileWriter', 'PXMDocInfo'],
+    'compare': ['PXMDiff', 'diff'],
+    'cli': ['iter_pxm_paths', 'scan_file', 'scan', 'main'],
+    # asyncio front end (Python 3.7+): reached as libpxm.aio only, so the eager import below never loads it
+    'aio': [],
+}
+_LAZY_NAMES = dict((name, module) for module, names in _SUBMODULE_NAMES.items() for name in names)
+
+__all__ = ['PXMLayerTypes'] + sorted(_LAZY_NAMES)
+
+
+def _submodule(module):
+    __import__(__name__ + '.' + module)
+    return sys.modules[__name__ + '.' + module]
+
+
+def __getattr__(name):
+    if name in _LAZY_NAMES:
+        value = getattr(_submodule(_LAZY_NAMES[name]), name)
+    elif name in _SUBMODULE_NAMES:
+        value = _submodule(name)
+    else:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES) | set(_SUBMODULE_NAMES))
+
+
+# Module __getattr__ needs Python 3.7; older interpreters load everything up front.
+if sys.version_info < (3, 7):
+    for _name in _LAZY_NAMES:
+        __getattr__(_name)
@@ -0,0 +1,6 @@
+from __future__ import print_function, unicode_literals
+import sys
+
+from .cli import main
+
+sys.exit(main())
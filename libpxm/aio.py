@@ -0,0 +1,120 @@
+"""asyncio front end for libpxm.
+
+File I/O and SQLite queries run on a shared, bounded thread pool, so an
+event loop can serve many documents without blocking:
+
+    from libpxm import aio
+    pxm1 = await aio.open_pxm(path)
+    for l in await pxm1.layers():
+        name = await pxm1.trait(l, 'PTImageIOFormatLayerNameInfoKey')
+"""
+import asyncio
+import functools
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from . import header
+from .document import PXMFileReader
+
+__author__ = 'Ethan Randall'
+
+
+class AsyncPXMRunner(object):
+    """Runs blocking libpxm calls in a thread pool, with backpressure.
+
+    `max_workers` threads do the work; at most `max_pending` calls may be
+    queued or running at once, and further callers wait for a free slot.
+    """
+
+    def __init__(self, max_workers=8, max_pending=64):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers)
+        #  event loop -> its semaphore; weak, so a closed loop is not kept alive by the runner
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self, loop):
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_pending)
+        return self._semaphores[loop]
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        async with self._semaphore(loop):
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait)
+
+
+_default_runner = None
+
+
+def default_runner():
+    global _default_runner
+    if _default_runner is None:
+        _default_runner = AsyncPXMRunner()
+    return _default_runner
+
+
+class AsyncPXMFile(object):
+    """An opened document whose accessors are awaitables.
+
+    Calls on one document are serialized, because they share one SQLite connection.
+    """
+
+    def __init__(self, reader, runner):
+        self.reader = reader
+        self.runner = runner
+        self._lock = asyncio.Lock()
+
+    @property
+    def pxm_file(self):
+        return self.reader.pmx_fo
+
+    @property
+    def root_plist(self):
+        return self.reader.pmx_fo.root_plist
+
+    async def _run(self, func, *args, **kwargs):
+        async with self._lock:
+            return await self.runner.run(func, *args, **kwargs)
+
+    async def layers(self):
+        return list(self.pxm_file.layers)
+
+    async def iter_layers(self, filter=None, columns=()):
+        """Like PXMFile.iter_layers, collected into a list off the event loop."""
+        return await self._run(lambda: list(self.pxm_file.iter_layers(filter, columns)))
+
+    async def trait_names(self, layer):
+        return await self._run(lambda: list(layer.traits))
+
+    async def trait(self, layer, key, default=None):
+        return await self._run(layer.traits.get, key, default)
+
+    async def trait_plist(self, layer):
+        return await self._run(lambda: layer.trait_plist)
+
+    async def state_plist(self, layer):
+        return await self._run(lambda: layer.state_plist)
+
+    async def pixels(self, layer, components=None, bits_per_component=None):
+        return await self._run(layer.pixels, components, bits_per_component)
+
+    async def document_info_value(self, name):
+        return await self._run(self.reader.sql_db.document_info_value, name)
+
+    async def flatten(self, tile_height=256):
+        return await self._run(self.pxm_file.flatten, tile_height)
+
+
+async def open_pxm(pxm_fp1, runner=None, **reader_kwargs):
+    """Open a .pxm off the event loop; `reader_kwargs` are passed to PXMFileReader."""
+    runner = runner or default_runner()
+    reader = await runner.run(PXMFileReader, pxm_fp1, **reader_kwargs)
+    return AsyncPXMFile(reader, runner)
+
+
+async def read_header(pxm_fp1, runner=None):
+    return await (runner or default_runner()).run(header.read_header, pxm_fp1)
@@ -0,0 +1,694 @@
+from __future__ import print_function, unicode_literals
+import biplist
+from collections import OrderedDict
+try:
+    from collections.abc import Mapping, Sequence
+except ImportError:
+    from collections import Mapping, Sequence
+import datetime
+import binascii
+import struct
+import hashlib
+import threading
+
+from .geometry import parse_geometry_string, format_geometry_string
+from .profile import _profile_stage, _profile_count
+
+__author__ = 'Ethan Randall'
+
+
+class NSColor(object):
+    def __init__(self):
+        self.NSColorSpace = NotImplemented
+        self.NSComponents = NotImplemented
+        self.NSRGB = NotImplemented
+        self.NSWhite = NotImplemented
+
+    @classmethod
+    def from_dict(cls, d1):
+        nsc1 = cls()
+        # if isinstance(d1['NSComponents'], biplist.Uid):
+        #     raise KeyError
+        # if isinstance(d1['NSColorSpace'], biplist.Uid):
+        #     raise KeyError
+        if not d1.get('NSColorSpace'):
+            pass
+
+        if d1.get('NSComponents'):
+            nsc1.NSComponents = NSComponents(d1['NSComponents'])
+
+        nsc1.NSColorSpace = d1['NSColorSpace']
+        if d1.get('NSRGB'):
+            nsc1.NSRGB = NSRGB(d1['NSRGB'])
+        if d1.get('NSWhite'):
+            nsc1.NSWhite = NSComponents(d1['NSWhite'])
+
+        return nsc1
+
+    @property
+    def rgba(self):
+        """(r, g, b, a) floats from NSRGB, NSWhite or NSComponents, whichever the archive has."""
+        if self.NSRGB is not NotImplemented:
+            return self.NSRGB.rgba
+        if self.NSWhite is not NotImplemented:
+            return self.NSWhite.rgba
+        if self.NSComponents is not NotImplemented:
+            return self.NSComponents.rgba
+        raise ValueError('No colour components archived.')
+
+
+class NSRGB(biplist.Data):
+    """Space-separated component floats ('r g b [a]'), split and converted once on first use."""
+
+    @property
+    def floats(self):
+        try:
+            return self._floats
+        except AttributeError:
+            self._floats = tuple(float(x) for x in self.rstrip(b'\x00').split())
+            return self._floats
+
+    @property
+    def rgba(self):
+        floats = self.floats
+        return floats[:3] + (floats[3] if len(floats) > 3 else 1.0,)
+
+    @property
+    def r(self):
+        return self.rgba[0]
+
+    @property
+    def g(self):
+        return self.rgba[1]
+
+    @property
+    def b(self):
+        return self.rgba[2]
+
+    @property
+    def a(self):
+        return self.rgba[3]
+
+
+class NSComponents(NSRGB):
+    """Grey ('w [a]') or RGB ('r g b [a]') component floats."""
+
+    @property
+    def is_greyscale(self):
+        return len(self.floats) < 3
+
+    @property
+    def has_alpha(self):
+        return (len(self.floats) % 2) == 0
+
+    @property
+    def rgba(self):
+        floats = self.floats
+        if self.is_greyscale:
+            floats = floats[:1] * 3 + floats[1:]
+        return floats[:3] + (floats[3] if len(floats) > 3 else 1.0,)
+
+    @property
+    def a(self):
+        if not self.has_alpha:
+            raise AttributeError('alpha not included')
+        return self.floats[-1]
+
+
+class NSArchivedPlist(object):
+    def __init__(self):
+        self.arc_plist = {}
+        self.real_plist = {}
+        self.uids = {}
+        self._class_decoders = {}
+        self._class_uids = {}
+        self._encoded = {}
+        self._in_progress = set()
+
+    @property
+    def top_uid(self):
+        if self.arc_plist.get('$top'):
+            if self.arc_plist['$top'].get('root'):
+                return self.arc_plist['$top']['root']
+            else:
+                return -1
+        else:
+            return None
+
+    @property
+    def arc_top(self):
+        if self.top_uid:
+            if self.top_uid == -1:
+                return self.arc_plist['$top']
+            else:
+                return self.arc_plist['$objects'][int(self.top_uid)]
+        else:
+            return {}
+
+    def resolve(self, uid):
+        """Return the decoded object for `uid`, decoding it (and what it references) on first use.
+
+        Objects that the built-in decoders would resolve are decoded first,
+        innermost first, from an explicit stack, so the decoders find them
+        done and deeply nested archives cannot exhaust the Python stack.
+        """
+        i1 = int(uid)
+        if i1 in self.uids:
+            return self.uids[i1]
+
+        stack = [(i1, False)]
+        expanded = set()
+        while stack:
+            j1, ready = stack.pop()
+            if j1 in self.uids:
+                continue
+            if ready:
+                self._decode(j1)
+            elif j1 not in expanded:
+                # An expanded object that is not decoded yet is on the current path, i.e. a cycle; its decoder
+                # resolves that reference itself.
+                expanded.add(j1)
+                stack.append((j1, True))
+                stack.extend((int(u), False) for u in self._references(j1))
+        return self.uids[i1]
+
+    def _references(self, i1):
+        o1 = self.arc_plist['$objects'][i1]
+        if not isinstance(o1, (dict, BPlistDict)) or '$classname' in o1:
+            return ()
+        refs = self.decoder_refs.get(self.q_ns_class(o1['$class']))
+        return () if refs is None else refs(self, o1)
+
+    def _decode(self, i1):
+        o1 = self.arc_plist['$objects'][i1]
+        if isinstance(o1, bytes):
+            self.uids[i1] = self._decode_blob(o1)
+        elif not isinstance(o1, (dict, BPlistDict)):
+            # UID 0 is always '$null', i.e. nil.
+            self.uids[i1] = None if i1 == 0 else o1
+        elif '$classname' in o1:
+            self.uids[i1] = o1['$classname']
+        else:
+            if i1 in self._in_progress:
+                raise ValueError('Object %d references itself before it could be built.' % i1)
+            self._in_progress.add(i1)
+            try:
+                self.uids[i1] = self.q_ns_class(o1['$class'])(self, o1, i1)
+            finally:
+                self._in_progress.discard(i1)
+
+    def resolve_dict(self, d):
+        return dict(zip(
+            [self.resolve(ku) if isinstance(ku, biplist.Uid) else ku for ku in d.keys()],
+            [self.resolve(vu) if isinstance(vu, biplist.Uid) else vu for vu in d.values()]
+        ))
+
+    def _decode_string(self, d, i):
+        return d['NS.string']
+
+    def _decode_dict(self, d, i):
+        # Registered before its members are walked, so a member can refer back to it.
+        self.uids[i] = d2 = {}
+        d2.update(zip(
+            [self.resolve(ku) for ku in d['NS.keys']],
+            [self.resolve(vu) for vu in d['NS.objects']]
+        ))
+        return d2
+
+    def _decode_array(self, d, i):
+        self.uids[i] = l2 = []
+        l2.extend(self.resolve(iu) for iu in d['NS.objects'])
+        return l2
+
+    def _decode_data(self, d, i):
+        return self._decode_blob(biplist.Data(d['NS.data']))
+
+    PTCGC_MAGIC = b'PTCGC\x00'
+
+    def _decode_blob(self, data):
+        # Colour blobs become PXMColor values sharing one interned ICC profile, so no decoded archive keeps a copy.
+        if data[:6] == self.PTCGC_MAGIC:
+            from .color import archived_color  # libpxm.color imports this module
+            return archived_color(data)
+        return data
+
+    def _decode_value(self, d, i):
+        return parse_geometry_string(self.resolve(d[self.NS_VALUE_KEYS[d['NS.special'] - 1]]))
+
+    def _decode_color(self, d, i):
+        return NSColor.from_dict(d)
+
+    def _decode_unpythonized(self, d, i):
+        return self.resolve_dict(d)
+
+    NS_VALUE_KEYS = ('NS.pointval', 'NS.sizeval', 'NS.rectval')
+
+    #  $classname -> decoder(archive, obj, uid); extend with register_decoder()
+    decoders = {
+        'NSString': _decode_string,
+        'NSMutableString': _decode_string,
+        'NSDictionary': _decode_dict,
+        'NSMutableDictionary': _decode_dict,
+        'NSArray': _decode_array,
+        'NSMutableArray': _decode_array,
+        'NSData': _decode_data,
+        'NSMutableData': _decode_data,
+        'NSValue': _decode_value,
+        'NSColor': _decode_color,
+        'NSColorSpace': _decode_unpythonized,
+        'GCColorStop': _decode_unpythonized,
+        'GCGradient': _decode_unpythonized,
+        'PXLayerStyle': _decode_unpythonized,
+        'PXSmartShape': _decode_unpythonized,
+    }
+
+    def _dict_refs(self, d):
+        return list(d['NS.keys']) + list(d['NS.objects'])
+
+    def _array_refs(self, d):
+        return d['NS.objects']
+
+    def _value_refs(self, d):
+        return [d[self.NS_VALUE_KEYS[d['NS.special'] - 1]]]
+
+    def _unpythonized_refs(self, d):
+        return [u for u in list(d.keys()) + list(d.values()) if isinstance(u, biplist.Uid)]
+
+    #  decoder -> the UIDs it resolves from an object, which resolve() decodes before calling it
+    decoder_refs = {
+        _decode_dict: _dict_refs,
+        _decode_array: _array_refs,
+        _decode_value: _value_refs,
+        _decode_unpythonized: _unpythonized_refs,
+    }
+
+    @classmethod
+    def register_decoder(cls, class_names, decoder=None):
+        """Decode archived objects of the given class name(s) with `decoder(archive, obj, uid)`.
+
+        `obj` is the raw archived dict and `archive` the NSArchivedPlist being
+        loaded, whose resolve() follows UIDs. The registry is shared by every
+        archive in the process. Without `decoder`, returns a decorator.
+        """
+        if not isinstance(class_names, (list, tuple, set, frozenset)):
+            class_names = (class_names,)
+
+        def add_decoder(f):
+            for class_str in class_names:
+                cls.decoders[class_str] = f
+            return f
+
+        if decoder is None:
+            return add_decoder
+        return add_decoder(decoder)
+
+    def q_ns_class(self, class_uid):
+        """Return the decoder for a class entry, looked up once per archive.
+
+        Unregistered classes fall back to the nearest registered class in $classes.
+        """
+        i1 = int(class_uid)
+        if i1 in self._class_decoders:
+            return self._class_decoders[i1]
+
+        class_obj = self.arc_plist['$objects'][i1]
+        for class_str in [class_obj['$classname']] + list(class_obj.get('$classes', [])):
+            if class_str in self.decoders:
+                self._class_decoders[i1] = self.decoders[class_str]
+                return self._class_decoders[i1]
+
+        raise ValueError('No known python type for %s!' % class_obj['$classname'])
+
+    def root_keys(self):
+        return [self.resolve(ku) for ku in self.arc_top['NS.keys']]
+
+    def root_get(self, key, default=None):
+        """Decode just `key` of an NSDictionary root; other root values are not touched."""
+        root = self.arc_top
+        for ku, vu in zip(root['NS.keys'], root['NS.objects']):
+            if self.resolve(ku) == key:
+                return self.resolve(vu)
+        return default
+
+    @classmethod
+    def load(cls, plist_in):
+        """Decode a keyed archive by walking it depth-first from $top.
+
+        Every object in $objects is decoded at most once and only if it is
+        reachable from the root, so the cost is linear in the archive size.
+        """
+        nsap1 = cls()
+        nsap1.arc_plist = plist_in
+        if nsap1.top_uid is None:
+            nsap1.real_plist = {}
+            return nsap1
+
+        assert nsap1.arc_plist['$archiver'] == 'NSKeyedArchiver'
+
+        try:
+            if nsap1.top_uid == -1:
+                nsap1.real_plist = nsap1.resolve_dict(nsap1.arc_top)
+            else:
+                nsap1.real_plist = nsap1.resolve(nsap1.top_uid)
+        except RecursionError:
+            # Custom decoders and reference cycles still recurse; a file must not be able to crash the caller.
+            raise ValueError('Keyed archive is nested too deeply to decode.')
+
+        return nsap1
+
+    def encode_class(self, class_name):
+        if class_name not in self._class_uids:
+            objects = self.arc_plist['$objects']
+            objects.append({'$classname': class_name, '$classes': [class_name, 'NSObject']})
+            self._class_uids[class_name] = biplist.Uid(len(objects) - 1)
+        return self._class_uids[class_name]
+
+    def encode(self, o1):
+        """Append `o1` (and what it contains) to $objects and return its UID.
+
+        Each object is archived once: strings, numbers, data and NSValues are
+        shared by value, dicts and lists by identity, so repeated keys get one
+        UID and shared or cyclic containers are kept as such. Other values,
+        including tuples that are not is_geometry(), raise TypeError.
+        """
+        if o1 is None:
+            return biplist.Uid(0)
+        if isinstance(o1, tuple) and hasattr(o1, 'ptcgc'):
+            o1 = biplist.Data(o1.ptcgc())
+
+        if isinstance(o1, (dict, list)):
+            memo_key = id(o1)
+        elif isinstance(o1, (bool, int, float, bytes, type(''))) or isinstance(o1, tuple) and self.is_geometry(o1):
+            memo_key = (type(o1), o1)
+        else:
+            raise TypeError('Cannot archive %s.' % type(o1).__name__)
+        if memo_key in self._encoded:
+            return self._encoded[memo_key]
+
+        objects = self.arc_plist['$objects']
+        i1 = len(objects)
+        objects.append(None)
+        self._encoded[memo_key] = uid1 = biplist.Uid(i1)
+        if isinstance(o1, dict):
+            keys = [self.encode(k) for k in o1.keys()]
+            values = [self.encode(v) for v in o1.values()]
+            objects[i1] = {'NS.keys': keys, 'NS.objects': values, '$class': self.encode_class('NSDictionary')}
+        elif isinstance(o1, list):
+            objects[i1] = {'NS.objects': [self.encode(v) for v in o1], '$class': self.encode_class('NSArray')}
+        elif isinstance(o1, tuple):
+            special = 3 if isinstance(o1[0], tuple) else 2
+            objects[i1] = {'NS.special': special,
+                           self.NS_VALUE_KEYS[special - 1]: self.encode(format_geometry_string(o1)),
+                           '$class': self.encode_class('NSValue')}
+        else:
+            objects[i1] = o1
+        return uid1
+
+    @staticmethod
+    def is_geometry(o1):
+        """Whether `o1` is an (x, y) or ((x, y), (w, h)) tuple of numbers, the shapes archived as NSValue."""
+        def is_pair(p1):
+            return isinstance(p1, tuple) and len(p1) == 2 and \
+                all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in p1)
+        return is_pair(o1) or isinstance(o1, tuple) and len(o1) == 2 and all(is_pair(p1) for p1 in o1)
+
+    @classmethod
+    def dump(cls, real_plist):
+        """Encode `real_plist` as a keyed archive, the inverse of load(); the archive is in arc_plist.
+
+        Dicts, lists, strings, numbers and data are archived as NSDictionary,
+        NSArray and plain plist objects; PXMColor values become PTCGC data, and
+        other tuples NSValue sizes, or rects when nested. Write it out with NSArchivedPlist.dumps().
+        """
+        nsap1 = cls()
+        nsap1.real_plist = real_plist
+        nsap1.arc_plist = {'$archiver': 'NSKeyedArchiver', '$version': 100000, '$objects': ['$null'], '$top': {}}
+        nsap1.arc_plist['$top']['root'] = nsap1.encode(real_plist)
+        return nsap1
+
+    @classmethod
+    def dumps(cls, real_plist):
+        """The binary plist bytes of dump(real_plist)."""
+        return biplist.writePlistToString(cls.dump(real_plist).arc_plist)
+
+
+class FrozenDict(dict):
+    """A dict that refuses changes; decoded archives shared through PXMArchiveCache use it."""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('Shared decoded archive objects are read-only; edit a copy made with libpxm.thaw().')
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+class FrozenList(list):
+    """A list that refuses changes; see FrozenDict."""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('Shared decoded archive objects are read-only; edit a copy made with libpxm.thaw().')
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = reverse = sort = clear = _read_only
+
+    def __reduce__(self):
+        return FrozenList, (list(self),)
+
+
+def _copy_containers(o1, memo, dict_type, list_type):
+    # Containers are copied into empty shells first, then filled, from an explicit stack rather than by recursion.
+    if not isinstance(o1, (dict, list)):
+        return o1
+    if id(o1) in memo:
+        return memo[id(o1)]
+
+    memo[id(o1)] = dict_type() if isinstance(o1, dict) else list_type()
+    stack = [o1]
+    filled = []
+    while stack:
+        c1 = stack.pop()
+        filled.append(c1)
+        for v1 in (c1.values() if isinstance(c1, dict) else c1):
+            if isinstance(v1, (dict, list)) and id(v1) not in memo:
+                memo[id(v1)] = dict_type() if isinstance(v1, dict) else list_type()
+                stack.append(v1)
+
+    def copied(v1):
+        return memo[id(v1)] if isinstance(v1, (dict, list)) else v1
+
+    for c1 in filled:
+        if isinstance(c1, dict):
+            dict.update(memo[id(c1)], [(k, copied(v1)) for k, v1 in c1.items()])
+        else:
+            list.extend(memo[id(c1)], [copied(v1) for v1 in c1])
+    return memo[id(o1)]
+
+
+def freeze(o1, memo=None):
+    """Return `o1` with its dicts and lists (recursively) replaced by FrozenDict / FrozenList."""
+    return _copy_containers(o1, {} if memo is None else memo, FrozenDict, FrozenList)
+
+
+def thaw(o1, memo=None):
+    """An editable deep copy of `o1`: its dicts and lists (recursively, frozen or not) copied to plain ones.
+
+    Shared and cyclic containers stay shared and cyclic in the copy; other
+    values are not copied. copy.deepcopy() would keep FrozenDict / FrozenList.
+    """
+    return _copy_containers(o1, {} if memo is None else memo, dict, list)
+
+
+class PXMArchiveCache(object):
+    """Bounded LRU of decoded keyed-archive blobs, keyed by the SHA-1 of the blob.
+
+    Layer styles and gradients are often byte-identical across layers and
+    documents, so each distinct blob is parsed and decoded once. The decoded
+    real_plist is frozen and returned to every caller, so take an editable
+    copy with thaw() before any change.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, blob):
+        key = hashlib.sha1(blob).digest()
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                _profile_count('archive_cache', hits=1)
+                decoded = self._entries.pop(key)
+                self._entries[key] = decoded
+                return decoded
+            self.misses += 1
+        _profile_count('archive_cache', misses=1)
+
+        with _profile_stage('archive_decode', bytes=len(blob)) as count1:
+            ap1 = NSArchivedPlist.load(biplist.readPlistFromString(blob))
+            count1(objects=len(ap1.uids))
+            decoded = freeze(ap1.real_plist)
+
+        with self._lock:
+            self._entries[key] = decoded
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return decoded
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries), 'maxsize': self.maxsize}
+
+
+archive_cache = PXMArchiveCache()
+
+
+class BPlistReader(object):
+    """Decodes a binary plist in place from a buffer (such as an mmap), one object at a time.
+
+    Only the trailer is read up front. Arrays and dicts come back as
+    BPlistArray / BPlistDict views whose members are decoded from their
+    offsets when first accessed, and every decoded object is memoized by its
+    reference number.
+    """
+
+    EPOCH = datetime.datetime(2001, 1, 1)
+
+    def __init__(self, buf, start=0, length=None):
+        if length is None:
+            length = len(buf) - start
+        self.buf = buf
+        self.start = start
+        if buf[start:start + 8] != b'bplist00':
+            raise ValueError('Not a binary plist.')
+
+        (self.offset_size, self.ref_size, self.num_objects, self.top_ref,
+         table_offset) = struct.unpack_from('>6xBBQQQ', buf, start + length - 32)
+        self.table_start = start + table_offset
+        self._objects = {}
+
+    def _uint(self, offset, size):
+        if size == 1:
+            return struct.unpack_from('>B', self.buf, offset)[0]
+        if size == 2:
+            return struct.unpack_from('>H', self.buf, offset)[0]
+        if size == 4:
+            return struct.unpack_from('>I', self.buf, offset)[0]
+        if size == 8:
+            return struct.unpack_from('>Q', self.buf, offset)[0]
+        return int(binascii.hexlify(self.buf[offset:offset + size]), 16) if size else 0
+
+    def object_offset(self, ref):
+        return self.start + self._uint(self.table_start + ref * self.offset_size, self.offset_size)
+
+    def _count(self, offset, nibble):
+        # Returns (count, offset of the payload that follows it).
+        if nibble != 0xF:
+            return nibble, offset + 1
+        int_marker = struct.unpack_from('>B', self.buf, offset + 1)[0]
+        size = 1 << (int_marker & 0xF)
+        return self._uint(offset + 2, size), offset + 2 + size
+
+    def _refs(self, offset, count):
+        return [self._uint(offset + i * self.ref_size, self.ref_size) for i in range(count)]
+
+    def top(self):
+        return self.object(self.top_ref)
+
+    def object(self, ref):
+        if ref in self._objects:
+            return self._objects[ref]
+
+        offset = self.object_offset(ref)
+        marker = struct.unpack_from('>B', self.buf, offset)[0]
+        kind, nibble = marker >> 4, marker & 0xF
+
+        if kind == 0x0:
+            o1 = {0x0: None, 0x8: False, 0x9: True}[nibble]
+        elif kind == 0x1:
+            size = 1 << nibble
+            if size == 8:
+                o1 = struct.unpack_from('>q', self.buf, offset + 1)[0]
+            elif size == 16:
+                o1 = struct.unpack_from('>q', self.buf, offset + 9)[0]
+            else:
+                o1 = self._uint(offset + 1, size)
+        elif kind == 0x2:
+            o1 = struct.unpack_from('>f' if nibble == 2 else '>d', self.buf, offset + 1)[0]
+        elif kind == 0x3:
+            o1 = self.EPOCH + datetime.timedelta(seconds=struct.unpack_from('>d', self.buf, offset + 1)[0])
+        elif kind in (0x4, 0x5, 0x6):
+            count, body = self._count(offset, nibble)
+            if kind == 0x4:
+                o1 = biplist.Data(self.buf[body:body + count])
+            elif kind == 0x5:
+                o1 = bytes(self.buf[body:body + count]).decode('ascii')
+            else:
+                o1 = bytes(self.buf[body:body + count * 2]).decode('utf-16-be')
+        elif kind == 0x8:
+            o1 = biplist.Uid(self._uint(offset + 1, nibble + 1))
+        elif kind in (0xA, 0xC):
+            count, body = self._count(offset, nibble)
+            o1 = BPlistArray(self, self._refs(body, count))
+        elif kind == 0xD:
+            count, body = self._count(offset, nibble)
+            refs = self._refs(body, count * 2)
+            o1 = BPlistDict(self, refs[:count], refs[count:])
+        else:
+            raise ValueError('Unknown binary plist marker 0x%02x at offset %d.' % (marker, offset))
+
+        self._objects[ref] = o1
+        return o1
+
+
+class BPlistArray(Sequence):
+    __slots__ = ('reader', 'refs')
+
+    def __init__(self, reader, refs):
+        self.reader = reader
+        self.refs = refs
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.reader.object(r) for r in self.refs[index]]
+        return self.reader.object(self.refs[index])
+
+    def __len__(self):
+        return len(self.refs)
+
+
+class BPlistDict(Mapping):
+    __slots__ = ('reader', 'key_refs', 'value_refs', '_index')
+
+    def __init__(self, reader, key_refs, value_refs):
+        self.reader = reader
+        self.key_refs = key_refs
+        self.value_refs = value_refs
+        self._index = None
+
+    @property
+    def index(self):
+        # Keys are decoded (all at once, they are short strings) on the first lookup.
+        if self._index is None:
+            self._index = dict(zip([self.reader.object(r) for r in self.key_refs], self.value_refs))
+        return self._index
+
+    def __getitem__(self, key):
+        return self.reader.object(self.index[key])
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.key_refs)
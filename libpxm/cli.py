@@ -0,0 +1,130 @@
+from __future__ import print_function, unicode_literals
+import json
+import multiprocessing
+import functools
+import os
+import os.path
+import sys
+import time
+
+from .compare import diff
+from .document import PXMFileReader
+from .profile import PXMProfile, _NO_STAGE
+
+__author__ = 'Ethan Randall'
+
+
+def iter_pxm_paths(paths_or_dir):
+    """Yield .pxm file paths from a directory (walked recursively), a single path, or an iterable of either."""
+    if isinstance(paths_or_dir, (str, bytes, type(''))):
+        paths_or_dir = [paths_or_dir]
+    for p1 in paths_or_dir:
+        if os.path.isdir(p1):
+            for dirpath, dirnames, filenames in os.walk(p1):
+                dirnames.sort()
+                for fn1 in sorted(filenames):
+                    if fn1.lower().endswith('.pxm'):
+                        yield os.path.join(dirpath, fn1)
+        else:
+            yield p1
+
+
+def scan_file(pxm_fp1, header_only=False, profile=False):
+    """Open one document and return its header and layer rows as plain data; errors are captured, not raised.
+
+    With profile=True the result also has a PXMProfile.to_dict() of the open under 'profile'.
+    """
+    result = {'path': pxm_fp1, 'header': None, 'layers': None, 'error': None}
+    prof1 = PXMProfile() if profile else None
+    t0 = time.time()
+    try:
+        with prof1 or _NO_STAGE:
+            reader1 = PXMFileReader(pxm_fp1, header_only=header_only)
+        result['header'] = reader1.pmx_fo.root_plist
+        if not header_only:
+            result['layers'] = [{'uuid': l.uuid,
+                                 'parent_uuid': l.parent_uuid,
+                                 'index_at_parent': l.index_at_parent,
+                                 'type': l.type,
+                                 'name': l.name} for l in reader1.pmx_fo.layers]
+    except Exception as e:
+        result['error'] = '%s: %s' % (type(e).__name__, e)
+    result['seconds'] = time.time() - t0
+    if prof1 is not None:
+        result['profile'] = prof1.to_dict()
+    return result
+
+
+def scan(paths_or_dir, workers=None, header_only=False, chunksize=8, profile=False):
+    """Scan many .pxm files over a process pool, yielding scan_file() results as they complete.
+
+    `workers` defaults to the number of CPUs; with workers=1 everything runs in this process.
+    With profile=True each result carries a profile; combine them with PXMProfile.aggregate().
+    """
+    pxm_paths = iter_pxm_paths(paths_or_dir)
+    scan_one = functools.partial(scan_file, header_only=header_only, profile=profile)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    if workers <= 1:
+        for pxm_fp1 in pxm_paths:
+            yield scan_one(pxm_fp1)
+        return
+
+    pool = multiprocessing.Pool(workers)
+    try:
+        for result in pool.imap_unordered(scan_one, pxm_paths, chunksize):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _json_default(o):
+    if isinstance(o, bytes):
+        return o.decode('utf-8', 'replace')
+    return repr(o)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog='libpxm', description='Read Pixelmator .pxm documents.')
+    commands = parser.add_subparsers(dest='command')
+    scan_cmd = commands.add_parser('scan', help='inventory .pxm files, one JSON object per line')
+    scan_cmd.add_argument('paths', nargs='+', help='.pxm files or directories to search')
+    scan_cmd.add_argument('-j', '--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    scan_cmd.add_argument('--header-only', action='store_true', help='only read the header plist')
+    scan_cmd.add_argument('--profile', action='store_true',
+                          help='add per-stage timings to each result and print their total to stderr')
+    diff_cmd = commands.add_parser('diff', help='report what changed between two .pxm files as JSON')
+    diff_cmd.add_argument('old', help='the earlier .pxm')
+    diff_cmd.add_argument('new', help='the later .pxm')
+    diff_cmd.add_argument('--no-timestamps', action='store_true',
+                          help='hash bitmaps even when their change timestamps match')
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 2
+    if args.command == 'diff':
+        diff1 = diff(args.old, args.new, trust_timestamps=not args.no_timestamps)
+        print(diff1.to_json(default=_json_default, indent=2, sort_keys=True))
+        return 1 if diff1 else 0
+
+    n_files = n_errors = 0
+    total_prof1 = PXMProfile()
+    t0 = time.time()
+    for result in scan(args.paths, workers=args.workers, header_only=args.header_only, profile=args.profile):
+        n_files += 1
+        if result['error']:
+            n_errors += 1
+        if args.profile:
+            total_prof1.merge(result['profile'])
+        print(json.dumps(result, default=_json_default, sort_keys=True))
+    elapsed = time.time() - t0
+
+    print('Scanned %d files (%d errors) in %.2f s, %.1f files/s.'
+          % (n_files, n_errors, elapsed, n_files / elapsed if elapsed else 0.0), file=sys.stderr)
+    if args.profile:
+        print(total_prof1.to_json(indent=2), file=sys.stderr)
+    return 1 if n_errors else 0
@@ -0,0 +1,223 @@
+from __future__ import print_function, unicode_literals
+from collections import namedtuple
+import hashlib
+import struct
+import threading
+
+from .archive import NSColor, NSRGB
+
+__author__ = 'Ethan Randall'
+
+
+class PXMICCProfile(bytes):
+    """An interned ICC profile; get them from icc_profiles.intern(), never construct them directly.
+
+    There is one object per distinct profile in the process, and profiles
+    compare in O(1) by their SHA-1 `digest`, so ones interned before and
+    after icc_profiles.clear() are still equal.
+    """
+
+    def __eq__(self, other):
+        if isinstance(other, PXMICCProfile):
+            return self is other or self.digest == other.digest
+        return bytes.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = bytes.__hash__
+
+    def __reduce__(self):
+        return _intern_profile, (bytes(self),)
+
+    @property
+    def description(self):
+        """The profile's 'desc' tag text (e.g. 'sRGB IEC61966-2.1'), or None."""
+        try:
+            n_tags = struct.unpack_from('>I', self, 128)[0]
+            for i in range(n_tags):
+                sig, offset, size = struct.unpack_from('>4sII', self, 132 + 12 * i)
+                if sig == b'desc':
+                    kind = self[offset:offset + 4]
+                    if kind == b'desc':
+                        length = struct.unpack_from('>I', self, offset + 8)[0]
+                        return self[offset + 12:offset + 12 + length].rstrip(b'\x00').decode('latin-1')
+                    if kind == b'mluc':
+                        rec_len, str_offset = struct.unpack_from('>II', self, offset + 20)
+                        return self[offset + str_offset:offset + str_offset + rec_len].decode('utf-16-be')
+        except struct.error:
+            pass
+        return None
+
+
+class PXMProfileStore(object):
+    """Process-wide intern table of ICC profiles, keyed by SHA-1.
+
+    Colours and document_info profiles from every document are interned
+    here, so each distinct profile is held in memory once however many
+    colours embed it. Documents use a handful of profiles, so entries are
+    kept until clear().
+    """
+
+    def __init__(self):
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def intern(self, icc):
+        """The shared PXMICCProfile equal to `icc` (bytes); None for an empty profile."""
+        if not icc:
+            return None
+        if isinstance(icc, PXMICCProfile):
+            return icc
+        digest = hashlib.sha1(icc).digest()
+        profile1 = self._profiles.get(digest)
+        if profile1 is None:
+            with self._lock:
+                profile1 = self._profiles.get(digest)
+                if profile1 is None:
+                    profile1 = PXMICCProfile(icc)
+                    profile1.digest = digest
+                    self._profiles[digest] = profile1
+        return profile1
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def stats(self):
+        return {'profiles': len(self._profiles), 'bytes': sum(len(p) for p in list(self._profiles.values()))}
+
+
+icc_profiles = PXMProfileStore()
+
+
+def _intern_profile(icc):
+    return icc_profiles.intern(icc)
+
+
+#  rgba: sRGB components and alpha; components: the colour in its own space (alpha last); profile: that space's ICC
+class PXMColor(namedtuple('PXMColor', ['rgba', 'components', 'profile'])):
+    __slots__ = ()
+
+    def ptcgc(self):
+        """The colour as a (version 1) PTCGC blob; NSArchivedPlist archives PXMColor values this way."""
+        rgba, components, icc = tuple(self.rgba), tuple(self.components), self.profile or b''
+        return (PXMColorDecoder.HEADER.pack(PXMColorDecoder.MAGIC, 1, 0, len(rgba) - 1) +
+                struct.pack('>%dd' % len(rgba), *rgba) + PXMColorDecoder.COUNT.pack(len(components)) +
+                struct.pack('>%dd' % len(components), *components) + PXMColorDecoder.COUNT.pack(len(icc)) + icc)
+
+
+class PXMColorDecoder(object):
+    """Decodes colour values from trait plists into PXMColor tuples with struct, once per distinct blob.
+
+    PTCGC blobs are laid out as:
+
+        'PTCGC\\x00', u32 version, u32 (0), u32 n, n + 1 big-endian doubles (sRGB and alpha),
+        u32 m, m big-endian doubles (native components and alpha), u32 ICC length, ICC profile
+
+    with little-endian counts. Decoded colours are memoized by the SHA-1 of
+    their blob, and embedded ICC profiles are interned in icc_profiles, so
+    colours with the same profile share one PXMICCProfile.
+    NSColor / NSRGB / NSComponents values decode to colours without a profile,
+    and PXMColor values (as keyed archives decode PTCGC blobs) pass through.
+    """
+
+    MAGIC = b'PTCGC\x00'
+    HEADER = struct.Struct('<6sIII')
+    COUNT = struct.Struct('<I')
+
+    def __init__(self):
+        self.colors = {}
+        self._doubles = {}
+
+    def _unpack_doubles(self, blob, offset, count):
+        if count not in self._doubles:
+            self._doubles[count] = struct.Struct('>%dd' % count)
+        return self._doubles[count].unpack_from(blob, offset), offset + 8 * count
+
+    def parse_ptcgc(self, blob):
+        magic, version, flags, n_rgb = self.HEADER.unpack_from(blob, 0)
+        if magic != self.MAGIC:
+            raise ValueError('Not a PTCGC colour blob.')
+        rgba, offset = self._unpack_doubles(blob, self.HEADER.size, n_rgb + 1)
+        n_native = self.COUNT.unpack_from(blob, offset)[0]
+        components, offset = self._unpack_doubles(blob, offset + 4, n_native)
+        icc_len = self.COUNT.unpack_from(blob, offset)[0]
+        offset += 4
+        if offset + icc_len > len(blob):
+            raise ValueError('Truncated PTCGC colour blob.')
+        return PXMColor(rgba[:3] + rgba[-1:], components, icc_profiles.intern(blob[offset:offset + icc_len]))
+
+    def decode(self, value):
+        """A PXMColor for a PTCGC blob, NSColor, NSRGB or NSComponents value; ValueError for anything else."""
+        if isinstance(value, PXMColor):
+            return value
+        if isinstance(value, NSColor):
+            rgba = value.rgba
+            return PXMColor(rgba, rgba, None)
+        if isinstance(value, NSRGB):
+            return PXMColor(value.rgba, value.floats, None)
+        if not self.is_color(value):
+            raise ValueError('Not a colour value.')
+
+        key = hashlib.sha1(value).digest()
+        color1 = self.colors.get(key)
+        if color1 is None:
+            color1 = self.colors[key] = self.parse_ptcgc(value)
+        return color1
+
+    @classmethod
+    def is_color(cls, value):
+        return isinstance(value, (PXMColor, NSColor, NSRGB)) or isinstance(value, bytes) and value[:6] == cls.MAGIC
+
+    def iter_colors(self, plist, path=()):
+        """Yield (key path, PXMColor) for every colour value in a decoded plist."""
+        if isinstance(plist, dict):
+            items = plist.items()
+        elif isinstance(plist, list):
+            items = enumerate(plist)
+        else:
+            return
+        for key, value in items:
+            if self.is_color(value):
+                yield path + (key,), self.decode(value)
+            else:
+                for item in self.iter_colors(value, path + (key,)):
+                    yield item
+
+
+_archive_decoder = PXMColorDecoder()
+
+
+def archived_color(blob):
+    """The PXMColor for a PTCGC blob met while decoding a keyed archive, or the blob itself.
+
+    The ICC profile is interned instead of being kept in every decoded (and
+    cached) archive. Blobs that would not archive back to the same bytes
+    are left as they are.
+    """
+    try:
+        color1 = _archive_decoder.parse_ptcgc(blob)
+    except (ValueError, struct.error):
+        return blob
+    return color1 if color1.ptcgc() == blob else blob
+
+
+def document_colors(pxm_fo, decoder=None):
+    """Every colour in the layers' trait plists as (refs, N x 4 float64 NumPy array of sRGB + alpha).
+
+    refs[i] is (layer uuid, key path) for row i. Layers whose traits have no
+    archive are skipped; pass a decoder to share its caches between documents.
+    """
+    import numpy
+    decoder = decoder or PXMColorDecoder()
+    refs = []
+    rgba = []
+    for l1 in pxm_fo.layers:
+        for path, color1 in decoder.iter_colors(l1.trait_plist):
+            refs.append((l1.uuid, path))
+            rgba.append(color1.rgba)
+    return refs, numpy.array(rgba, numpy.float64).reshape(-1, 4)
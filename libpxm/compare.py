@@ -0,0 +1,174 @@
+from __future__ import print_function, unicode_literals
+import json
+
+from .archive import archive_cache
+from .document import PXMFile, PXMFileReader
+from .profile import _profile_stage
+
+__author__ = 'Ethan Randall'
+
+
+NAME_KEY = 'PTImageIOFormatLayerNameInfoKey'
+TIMESTAMP_KEY = 'PTImageIOFormatLayerBitmapDataChangeTimestampInfoKey'
+BITMAP_KEY = 'PTImageIOFormatLayerBitmapDataInfoKey'
+TRAITS_KEY = 'PTImageIOFormatLayerSpecificDataInfoKey'
+
+
+class PXMDiff(object):
+    """What changed between two documents; see diff().
+
+    added / removed: layer rows (uuid, name, type, parent_uuid, index_at_parent).
+    moved: uuid, name, and old / new (parent_uuid, index_at_parent).
+    modified: uuid, name, the changed layer_info `keys`, and `traits`, the
+    key paths that differ inside the trait plist when it changed.
+    document_info: changed document_info keys; header: changed header plist keys.
+    """
+
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.moved = []
+        self.modified = []
+        self.document_info = []
+        self.header = []
+
+    def __bool__(self):
+        return any(self.to_dict().values())
+
+    __nonzero__ = __bool__
+
+    def to_dict(self):
+        return {'added': self.added, 'removed': self.removed, 'moved': self.moved, 'modified': self.modified,
+                'document_info': self.document_info, 'header': self.header}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+
+def _info_rows(sql_db, table, small_len):
+    """{(layer uuid or None, name): (rowid, length, value if at most small_len bytes else None)}."""
+    uuid_col = 'layer_uuid' if table == 'layer_info' else 'NULL'
+    return dict(((r[1], r[2]), (r[0], r[3], r[4])) for r in sql_db.conn.execute(
+        "SELECT rowid, %s, name, length(CAST(value AS BLOB)), "
+        "CASE WHEN length(CAST(value AS BLOB)) <= ? THEN value END from %s;" % (uuid_col, table), (small_len,)))
+
+
+def _changed_keys(sql_db_a, sql_db_b, table, rows_a, rows_b, small_len, same_bitmaps):
+    """Keys whose values differ; large values are compared by length, then by a streamed SHA-1."""
+    changed = set()
+    for key in set(rows_a) | set(rows_b):
+        if key not in rows_a or key not in rows_b:
+            changed.add(key)
+            continue
+        (rowid_a, len_a, value_a), (rowid_b, len_b, value_b) = rows_a[key], rows_b[key]
+        if len_a != len_b:
+            changed.add(key)
+        elif len_a is None or len_a <= small_len:
+            if value_a != value_b:
+                changed.add(key)
+        elif key[1] == BITMAP_KEY and key[0] in same_bitmaps:
+            continue
+        else:
+            with _profile_stage('diff_digest', bytes=2 * len_a):
+                if sql_db_a.value_digest(table, rowid_a) != sql_db_b.value_digest(table, rowid_b):
+                    changed.add(key)
+    return changed
+
+
+def _plist_changes(a, b, path=()):
+    """Key paths at which two decoded plists differ, descending into dicts present on both sides."""
+    if a == b:
+        return []
+    if isinstance(a, dict) and isinstance(b, dict):
+        changes = []
+        for key in sorted(set(a) | set(b), key=repr):
+            if key not in a or key not in b:
+                changes.append(path + (key,))
+            else:
+                changes.extend(_plist_changes(a[key], b[key], path + (key,)))
+        return changes
+    return [path]
+
+
+def _open(pxm):
+    if isinstance(pxm, PXMFile):
+        return pxm
+    return PXMFileReader(pxm, load_layers=False).pmx_fo
+
+
+def diff(pxm_a, pxm_b, small_len=1024, trust_timestamps=True):
+    """Compare two documents (paths or PXMFile objects) and return a PXMDiff of b relative to a.
+
+    Layer rows are compared as-is. layer_info and document_info values up to
+    `small_len` bytes are compared directly and larger ones by length, then
+    by a SHA-1 streamed out of the database. Bitmaps whose change timestamp
+    and length are equal on both sides are taken to be unchanged without
+    hashing, unless trust_timestamps=False. Trait plists are only decoded
+    for layers whose trait blob differs. Nothing else is decoded, so the
+    cost is dominated by hashing the blobs that may have changed.
+    """
+    pxm_a, pxm_b = _open(pxm_a), _open(pxm_b)
+    sql_db_a, sql_db_b = pxm_a.sql_db, pxm_b.sql_db
+    if sql_db_a is None or sql_db_b is None:
+        raise ValueError('No layer database; the file was opened header-only.')
+    result = PXMDiff()
+
+    layer_query = "SELECT layer_uuid, parent_uuid, index_at_parent, type from document_layer;"
+    layers_a = dict((r[0], tuple(r[1:])) for r in sql_db_a.conn.execute(layer_query))
+    layers_b = dict((r[0], tuple(r[1:])) for r in sql_db_b.conn.execute(layer_query))
+    info_a = _info_rows(sql_db_a, 'layer_info', small_len)
+    info_b = _info_rows(sql_db_b, 'layer_info', small_len)
+
+    def name(layer_uuid, info):
+        value = info.get((layer_uuid, NAME_KEY), (None, None, None))[2]
+        return value.decode('utf-8', 'replace') if isinstance(value, bytes) else value
+
+    def layer_entry(layer_uuid, row1, info):
+        return {'uuid': layer_uuid, 'name': name(layer_uuid, info), 'type': row1[2],
+                'parent_uuid': row1[0], 'index_at_parent': row1[1]}
+
+    for layer_uuid in sorted(set(layers_a) - set(layers_b)):
+        result.removed.append(layer_entry(layer_uuid, layers_a[layer_uuid], info_a))
+    for layer_uuid in sorted(set(layers_b) - set(layers_a)):
+        result.added.append(layer_entry(layer_uuid, layers_b[layer_uuid], info_b))
+
+    common = set(layers_a) & set(layers_b)
+    for layer_uuid in sorted(common):
+        if layers_a[layer_uuid][:2] != layers_b[layer_uuid][:2]:
+            result.moved.append({'uuid': layer_uuid, 'name': name(layer_uuid, info_b),
+                                 'old': layers_a[layer_uuid][:2], 'new': layers_b[layer_uuid][:2]})
+
+    same_bitmaps = set()
+    if trust_timestamps:
+        for layer_uuid in common:
+            stamp_a = info_a.get((layer_uuid, TIMESTAMP_KEY))
+            stamp_b = info_b.get((layer_uuid, TIMESTAMP_KEY))
+            if stamp_a is not None and stamp_b is not None and stamp_a[2] is not None and stamp_a[2] == stamp_b[2]:
+                same_bitmaps.add(layer_uuid)
+
+    common_info_a = dict((k, v) for k, v in info_a.items() if k[0] in common)
+    common_info_b = dict((k, v) for k, v in info_b.items() if k[0] in common)
+    changed = _changed_keys(sql_db_a, sql_db_b, 'layer_info', common_info_a, common_info_b,
+                            small_len, same_bitmaps)
+    changed_by_layer = {}
+    for layer_uuid, key in changed:
+        changed_by_layer.setdefault(layer_uuid, []).append(key)
+
+    for layer_uuid in sorted(changed_by_layer):
+        keys = sorted(changed_by_layer[layer_uuid])
+        traits = None
+        if TRAITS_KEY in keys and (layer_uuid, TRAITS_KEY) in info_a and (layer_uuid, TRAITS_KEY) in info_b:
+            with _profile_stage('diff_traits'):
+                traits = _plist_changes(*[
+                    archive_cache.load(sql_db.conn.execute(
+                        "SELECT value from layer_info WHERE rowid = ?;", (info[(layer_uuid, TRAITS_KEY)][0],)
+                    ).fetchone()[0]) for sql_db, info in ((sql_db_a, info_a), (sql_db_b, info_b))])
+        result.modified.append({'uuid': layer_uuid, 'name': name(layer_uuid, info_b), 'keys': keys,
+                                'traits': traits})
+
+    doc_changed = _changed_keys(sql_db_a, sql_db_b, 'document_info',
+                                _info_rows(sql_db_a, 'document_info', small_len),
+                                _info_rows(sql_db_b, 'document_info', small_len), small_len, ())
+    result.document_info = sorted(key for _, key in doc_changed)
+    result.header = sorted(set(path[0] for path in _plist_changes(pxm_a.root_plist, pxm_b.root_plist) if path))
+    return result
@@ -0,0 +1,88 @@
+from __future__ import print_function, unicode_literals
+from collections import namedtuple
+import os
+import struct
+import zlib
+
+__author__ = 'Ethan Randall'
+
+
+PXMSection = namedtuple('PXMSection', ['name', 'header_offset', 'data_offset', 'length', 'size', 'compression'])
+
+
+class PXMContainer(object):
+    """Byte ranges of every section in a .pxm, found by parsing the container structure.
+
+    After the PXMDMETA header plist comes a ZIP-style stream of local file
+    entries (PK\\x03\\x04 headers), one per embedded section. Each header is
+    parsed for its name, extra-field length, sizes and compression, so any
+    section can be read on its own by seeking to it. Only the headers are
+    read while indexing. The header plist is listed as the 'PXMDMETA' section.
+    """
+
+    LOCAL_HEADER = struct.Struct('<4sHHHHHIIIHH')
+    LOCAL_MAGIC = b'PK\x03\x04'
+    SQL_SECTION_NAME = 'document/info'
+
+    def __init__(self, pxm_fp1, pxm_fd1=None):
+        self.pxm_fp1 = pxm_fp1
+        self.sections = []
+        if pxm_fd1 is None:
+            with open(pxm_fp1, 'rb') as pxm_fd1:
+                self.index(pxm_fd1)
+        else:
+            self.index(pxm_fd1)
+
+    def index(self, pxm_fd1):
+        pxm_fd1.seek(0, os.SEEK_END)
+        file_size = pxm_fd1.tell()
+        pxm_fd1.seek(0)
+        assert (struct.unpack('<8s', pxm_fd1.read(8))[0] == b'PXMDMETA'), 'Invalid magic number.'
+        h_pl_len = struct.unpack('<i', pxm_fd1.read(4))[0]
+        self.sections.append(PXMSection('PXMDMETA', 0, 12, h_pl_len, h_pl_len, 0))
+
+        offset = 12 + h_pl_len
+        while offset + self.LOCAL_HEADER.size <= file_size:
+            pxm_fd1.seek(offset)
+            (magic, version, flags, compression, mod_time, mod_date, crc32,
+             length, size, name_len, extra_len) = self.LOCAL_HEADER.unpack(pxm_fd1.read(self.LOCAL_HEADER.size))
+            if magic != self.LOCAL_MAGIC:
+                break
+
+            name = pxm_fd1.read(name_len).decode('utf-8')
+            data_offset = offset + self.LOCAL_HEADER.size + name_len + extra_len
+            # Streamed (flag 0x08) or zip64 entries may not record a size here; they run to the end of the file.
+            if (length == 0 and flags & 0x08) or length == 0xFFFFFFFF or data_offset + length > file_size:
+                length = file_size - data_offset
+            self.sections.append(PXMSection(name, offset, data_offset, length, size, compression))
+            offset = data_offset + length
+
+    def section(self, name):
+        for section1 in self.sections:
+            if section1.name == name:
+                return section1
+        raise KeyError(name)
+
+    def sql_section(self):
+        """The section holding the SQLite database: 'document/info', else the first embedded entry."""
+        try:
+            return self.section(self.SQL_SECTION_NAME)
+        except KeyError:
+            if len(self.sections) < 2:
+                raise ValueError('No embedded sections after the header plist.')
+            return self.sections[1]
+
+    def read(self, name, pxm_fd1=None):
+        """Return the (decompressed) bytes of one section, reading nothing else."""
+        section1 = self.section(name)
+        if pxm_fd1 is None:
+            with open(self.pxm_fp1, 'rb') as pxm_fd1:
+                return self.read(name, pxm_fd1)
+
+        pxm_fd1.seek(section1.data_offset)
+        data = pxm_fd1.read(section1.length)
+        if section1.compression == 0:
+            return data
+        if section1.compression == 8:
+            return zlib.decompress(data, -15)
+        raise ValueError('Unsupported compression method %d for section %s.' % (section1.compression, name))
@@ -0,0 +1,554 @@
+from __future__ import print_function, unicode_literals
+import biplist
+import datetime
+import uuid
+import struct
+import os
+import zlib
+
+from .archive import NSArchivedPlist, BPlistReader, archive_cache
+from .color import icc_profiles
+from .container import PXMContainer, PXMSection
+from .geometry import parse_geometry_string
+from .header import read_header_archive
+from .layers import PXMLayer, PXMLayerTraits
+from .pixels import PXMCompositor
+from .profile import PXMProfile, _profile_stage, _profile_count
+from .sqldb import PXMSqlDB
+
+__author__ = 'Ethan Randall'
+
+
+class PXMFile(object):
+    LAYER_COLUMNS = ('layer_uuid', 'parent_uuid', 'index_at_parent', 'type')
+    # One join per layer_info key; SQLite builds an automatic index for it instead of scanning per layer.
+    TRAIT_JOIN = ' LEFT JOIN (SELECT layer_uuid, value from layer_info WHERE name = ?) AS t%d' \
+                 ' ON t%d.layer_uuid = dl.layer_uuid'
+
+    def __init__(self):
+        self.root_plist = {}
+        self.header_bytes = None
+        self.layers = []
+        self.layers_dict = {}
+        self.children_dict = {}
+        self.sql_db = None
+        self._doc_info = None
+
+    def build_layer_dict(self):
+        self.children_dict = {}
+        for l in self.layers:
+            assert isinstance(l, PXMLayer)
+            self.layers_dict[l.uuid] = l
+            self.children_dict.setdefault(l.parent_uuid, []).append(l)
+
+        for siblings in self.children_dict.values():
+            siblings.sort(key=lambda l: l.index_at_parent)
+
+    def children(self, parent_uuid=None):
+        """Layers directly under `parent_uuid` (None for the top level), in index_at_parent order."""
+        return self.children_dict.get(parent_uuid, [])
+
+    def walk(self, parent_uuid=None):
+        """Yield (depth, layer) for the tree under `parent_uuid`, depth-first in index_at_parent order."""
+        stack = [(0, l) for l in reversed(self.children(parent_uuid))]
+        while stack:
+            depth, l1 = stack.pop()
+            yield depth, l1
+            stack.extend((depth + 1, l2) for l2 in reversed(self.children(l1.uuid)))
+
+    @property
+    def doc_info(self):
+        """The document_info table as a PXMDocInfo, created on first use."""
+        if self.sql_db is None:
+            raise ValueError('No layer database; the file was opened header-only.')
+        if self._doc_info is None or self._doc_info.sql_db is not self.sql_db:
+            self._doc_info = PXMDocInfo(self.sql_db)
+        return self._doc_info
+
+    @property
+    def color_profile(self):
+        """The document's ICC profile as the process-wide shared PXMICCProfile, or None."""
+        if self.sql_db is None:
+            return None
+        return self.doc_info.color_profile
+
+    def flatten(self, tile_height=256):
+        """Composite the visible bitmap layers into one H x W x 4 RGBA image (see PXMCompositor)."""
+        return PXMCompositor(self).flatten(tile_height)
+
+    def iter_layers(self, filter=None, columns=()):
+        """Yield layers one at a time from a document_layer cursor, without keeping them.
+
+        `filter` maps names to required values and is evaluated by SQLite. Names
+        can be document_layer columns ('uuid' is accepted for layer_uuid, and
+        'type' accepts 'bitmap' / 'vector') or layer_info keys, which are compared
+        with the value as stored. A value of None matches NULL or a missing key.
+        A list, tuple or set value matches any of its items. `columns` names
+        layer_info keys to fetch in the same query; they are already cached in
+        the yielded layers' traits, as are the key names and small values of
+        the matching layers, which are read first in one pass over layer_info.
+        """
+        if self.sql_db is None:
+            raise ValueError('No layer database; the file was opened header-only.')
+
+        columns = list(columns)
+        joins = list(columns)
+        where = []
+        params = []
+        for key, value in (filter or {}).items():
+            if key == 'uuid':
+                key = 'layer_uuid'
+            if key in self.LAYER_COLUMNS:
+                lhs = 'dl.' + key
+            else:
+                lhs = 't%d.value' % len(joins)
+                joins.append(key)
+
+            if key == 'type':
+                value = [PXMLayer.full_type(v) for v in value] \
+                    if isinstance(value, (list, tuple, set, frozenset)) else PXMLayer.full_type(value)
+
+            if value is None:
+                where.append(lhs + ' IS NULL')
+            elif isinstance(value, (list, tuple, set, frozenset)):
+                where.append('%s IN (%s)' % (lhs, ', '.join('?' * len(value))))
+                params.extend(value)
+            else:
+                where.append(lhs + ' = ?')
+                params.append(value)
+
+        from_sql = ' from document_layer AS dl' + ''.join(self.TRAIT_JOIN % (i, i) for i in range(len(joins)))
+        if where:
+            from_sql += ' WHERE ' + ' AND '.join(where)
+        sql = 'SELECT ' + ', '.join(['dl.' + c for c in self.LAYER_COLUMNS] +
+                                    ['t%d.value' % i for i in range(len(columns))]) + from_sql
+
+        if where:
+            info_index = self.sql_db.layer_info_index(layer_query='SELECT dl.layer_uuid' + from_sql,
+                                                      params=joins + params)
+        else:
+            info_index = self.sql_db.layer_info_index()
+        for row1 in self.sql_db.conn.execute(sql + ';', joins + params):
+            l1 = PXMLayer.from_row(*row1[:4])
+            names, values = info_index.get(l1.uuid, ((), {}))
+            l1.traits = PXMLayerTraits(self.sql_db, l1.uuid, names, values)
+            for key, value in zip(columns, row1[4:]):
+                if value is not None:
+                    l1.traits._values[key] = value
+            yield l1
+
+
+class PXMFileReader(object):
+    """Read a .pxm into a PXMFile, `pmx_fo`.
+
+    Databases larger than `memory_limit` bytes (default
+    PXMSqlDB.MEMORY_LIMIT) are opened from a temp file, not memory.
+    """
+
+    def __init__(self, pxm_fp1, in_place=True, header_only=False, load_layers=True, cache=None, memory_limit=None):
+        self.sql_db = None
+        self.pmx_fo = PXMFile()
+        self.container = None
+        prof1 = PXMProfile.current()
+        if prof1 is not None:
+            prof1.opens += 1
+        if cache is not None:
+            with _profile_stage('decode_cache_get') as count1:
+                cache_key = cache.file_key(pxm_fp1)
+                cached = cache.get(cache_key)
+                count1(hits=int(cached is not None), misses=int(cached is None))
+            if cached is not None and (header_only or 'layers' in cached and not cached['sql_section'][-1]):
+                self.load_cached(pxm_fp1, cached, header_only, load_layers, memory_limit)
+                return
+
+        sql_section = None
+        with open(pxm_fp1, 'rb') as pxm_fd1:
+            plist_bytes, ap1 = read_header_archive(pxm_fd1)
+
+            self.pmx_fo.root_plist = ap1.real_plist
+            self.pmx_fo.header_bytes = plist_bytes
+
+            if not header_only:
+                with _profile_stage('container_index'):
+                    self.container = PXMContainer(pxm_fp1, pxm_fd1)
+                    sql_section = self.container.sql_section()
+                _profile_count('container_index', sections=len(self.container.sections))
+                in_place = in_place and not sql_section.compression
+                if not in_place:
+                    with _profile_stage('sql_section_read', bytes=sql_section.length):
+                        sql_bytes = self.container.read(sql_section.name, pxm_fd1)
+
+        if not header_only:
+            if in_place:
+                self.sql_db = PXMSqlDB.from_file(pxm_fp1, sql_section.data_offset, sql_section.length, memory_limit)
+            else:
+                self.sql_db = PXMSqlDB(sql_bytes)
+
+            self.pmx_fo.sql_db = self.sql_db
+            if load_layers:
+                with _profile_stage('layer_query') as count1:
+                    self.pmx_fo.layers.extend(self.pmx_fo.iter_layers())
+                    self.pmx_fo.build_layer_dict()
+                    count1(rows=len(self.pmx_fo.layers))
+
+        if cache is not None:
+            with _profile_stage('decode_cache_put'):
+                cache.put(cache_key, self.cache_entry(sql_section))
+
+    def cache_entry(self, sql_section):
+        """The decoded state worth keeping in a PXMDecodeCache; trait plists of every layer are decoded for it."""
+        entry = {'root_plist': self.pmx_fo.root_plist}
+        if self.sql_db is not None:
+            info_index = self.sql_db.layer_info_index()
+            entry['sql_section'] = tuple(sql_section)
+            entry['layers'] = [(l.uuid, l.parent_uuid, l.index_at_parent, l.type) + info_index.get(l.uuid, ([], {})) +
+                               (l.trait_plist, l.state_plist)
+                               for l in (self.pmx_fo.layers or self.pmx_fo.iter_layers())]
+        return entry
+
+    def load_cached(self, pxm_fp1, cached, header_only, load_layers, memory_limit=None):
+        """Rebuild from a cache entry; the SQLite payload is only opened if a value outside it is needed."""
+        self.pmx_fo.root_plist = cached['root_plist']
+        if header_only:
+            return
+
+        # Only the local headers are read, so PXMFileWriter.from_reader() can update() a warm open too.
+        with _profile_stage('container_index'):
+            self.container = PXMContainer(pxm_fp1)
+        sql_section = PXMSection(*cached['sql_section'])
+        self.sql_db = PXMSqlDB.deferred(pxm_fp1, sql_section.data_offset, sql_section.length, memory_limit)
+        self.pmx_fo.sql_db = self.sql_db
+        if load_layers:
+            for layer_uuid, parent_uuid, index_at_parent, layer_type, names, values, trait_plist, state_plist \
+                    in cached['layers']:
+                l1 = PXMLayer.from_row(layer_uuid, parent_uuid, index_at_parent, layer_type)
+                l1.traits = PXMLayerTraits(self.sql_db, layer_uuid, names, values)
+                l1.trait_plist = trait_plist
+                l1.state_plist = state_plist
+                self.pmx_fo.layers.append(l1)
+            self.pmx_fo.build_layer_dict()
+
+
+class PXMFileWriter(object):
+    """Write a PXMFile back to disk: the PXMDMETA header, the document/info entry and the SQLite payload.
+
+    Changes come from the document itself: its root_plist, layer_info keys
+    set or deleted through any PXMLayerTraits of its database, layer rows of
+    PXMFile.layers (parent, index, type, and layers not yet in the database),
+    plus the pending `document_info` values, where None deletes a key.
+    write() makes a complete file; update() patches the file the document
+    was read from in place. Either way the changes are committed to the
+    document's own database, which moves to a temp file on the first save.
+    """
+
+    # ZIP extra field id used (as by zipalign) for padding after the local header.
+    PADDING_EXTRA_ID = 0xD935
+    HEADER_PADDING = 4096
+
+    def __init__(self, pxm_fo, container=None):
+        self.pxm_fo = pxm_fo
+        self.container = container
+        self.document_info = {}
+
+    @classmethod
+    def from_reader(cls, reader1):
+        return cls(reader1.pmx_fo, reader1.container)
+
+    def header_bytes(self):
+        """The header plist, re-encoded only if root_plist no longer matches the bytes it was read from."""
+        old_bytes = self.pxm_fo.header_bytes
+        if old_bytes is not None and \
+                NSArchivedPlist.load(biplist.readPlistFromString(old_bytes)).real_plist == self.pxm_fo.root_plist:
+            return old_bytes
+        return NSArchivedPlist.dumps(self.pxm_fo.root_plist)
+
+    @staticmethod
+    def db_uuid(layer_uuid):
+        return str(layer_uuid).upper() if isinstance(layer_uuid, uuid.UUID) else layer_uuid
+
+    def apply_changes(self, conn):
+        with conn:
+            for name, value in self.document_info.items():
+                conn.execute("DELETE from document_info WHERE name = ?;", (name,))
+                if value is not None:
+                    conn.execute("INSERT INTO document_info VALUES (?, ?);", (name, value))
+
+            for l1 in self.pxm_fo.layers:
+                layer_uuid = self.db_uuid(l1.uuid)
+                row1 = (l1.parent_uuid, l1.index_at_parent, l1.type)
+                old_row1 = conn.execute("SELECT parent_uuid, index_at_parent, type from document_layer "
+                                        "WHERE layer_uuid = ?;", (layer_uuid,)).fetchone()
+                if old_row1 is None:
+                    conn.execute("INSERT INTO document_layer VALUES (?, ?, ?, ?);", (layer_uuid,) + row1)
+                elif tuple(old_row1) != row1:
+                    conn.execute("UPDATE document_layer SET parent_uuid = ?, index_at_parent = ?, type = ? "
+                                 "WHERE layer_uuid = ?;", row1 + (layer_uuid,))
+                if not isinstance(l1.traits, PXMLayerTraits):
+                    # A plain dict is a new layer's whole set.
+                    self.apply_traits(conn, layer_uuid, l1.traits, l1.traits)
+
+            for traits1 in self.pxm_fo.sql_db.changed_traits:
+                self.apply_traits(conn, self.db_uuid(traits1.layer_uuid), traits1, traits1.changed)
+
+    @staticmethod
+    def apply_traits(conn, layer_uuid, traits, names):
+        for name in names:
+            conn.execute("DELETE from layer_info WHERE layer_uuid = ? AND name = ?;", (layer_uuid, name))
+            if name in traits:
+                conn.execute("INSERT INTO layer_info VALUES (?, ?, ?);", (layer_uuid, name, traits[name]))
+
+    def commit(self):
+        """Commit the changes to the document's database; returns it (see PXMSqlDB.committed_pages)."""
+        sql_db = self.pxm_fo.sql_db
+        if sql_db is None:
+            raise ValueError('No layer database; the file was opened header-only.')
+        sql_db.make_writable()
+        with _profile_stage('writer_commit'):
+            self.apply_changes(sql_db.conn)
+        return sql_db
+
+    def local_header(self, length, crc, extra_len, name=PXMContainer.SQL_SECTION_NAME):
+        """A stored ZIP local header for a `length` byte payload whose extra field is `extra_len` bytes of padding."""
+        name = name.encode('utf-8')
+        extra = b''
+        if extra_len:
+            assert extra_len >= 4, 'Padding needs at least 4 bytes.'
+            extra = struct.pack('<HH', self.PADDING_EXTRA_ID, extra_len - 4) + b'\x00' * (extra_len - 4)
+        return PXMContainer.LOCAL_HEADER.pack(PXMContainer.LOCAL_MAGIC, 20, 0, 0, 0, 0, crc & 0xFFFFFFFF,
+                                              length, length, len(name), len(extra)) + name + extra
+
+    def write(self, pxm_fp1):
+        """Write the whole document to `pxm_fp1`, leaving HEADER_PADDING bytes for later in-place updates.
+
+        Sections other than the header and the database are copied from the
+        source container, if there is one, in their original order.
+        """
+        header = self.header_bytes()
+        self.write_file(pxm_fp1, header, self.commit())
+
+    def write_file(self, pxm_fp1, header, sql_db):
+        sql_db.checkpoint()
+        sql_name = self.container.sql_section().name if self.container else PXMContainer.SQL_SECTION_NAME
+        tmp_fp1 = pxm_fp1 + '.tmp'
+        with open(tmp_fp1, 'wb') as out_fd:
+            out_fd.write(b'PXMDMETA' + struct.pack('<i', len(header)) + header)
+            sections = self.container.sections[1:] if self.container else [PXMSection(sql_name, 0, 0, 0, 0, 0)]
+            for section1 in sections:
+                if section1.name == sql_name:
+                    self.write_payload(out_fd, sql_db, sql_name)
+                    continue
+                with open(self.container.pxm_fp1, 'rb') as src_fd:
+                    src_fd.seek(section1.header_offset)
+                    out_fd.write(src_fd.read(section1.data_offset + section1.length - section1.header_offset))
+        if hasattr(os, 'replace'):
+            os.replace(tmp_fp1, pxm_fp1)
+        else:
+            os.rename(tmp_fp1, pxm_fp1)
+        sql_db.synced_fp1 = os.path.abspath(pxm_fp1)
+        if self.container is None or self.container.pxm_fp1 == pxm_fp1:
+            # The old section offsets are gone; index the new file so a later update() copies the right bytes.
+            self.container = PXMContainer(pxm_fp1)
+            self.pxm_fo.header_bytes = header
+        self.written()
+
+    def write_payload(self, out_fd, sql_db, name):
+        """Stream the checkpointed database file after its local header, whose size and CRC are filled in after."""
+        header_offset = out_fd.tell()
+        out_fd.write(self.local_header(0, 0, self.HEADER_PADDING, name))
+        length = crc = 0
+        with open(sql_db.temp_fn, 'rb') as db_fd:
+            for chunk in iter(lambda: db_fd.read(1024 * 1024), b''):
+                if not length:
+                    chunk = _rollback_page(chunk)
+                crc = zlib.crc32(chunk, crc)
+                length += len(chunk)
+                out_fd.write(chunk)
+        out_fd.seek(header_offset)
+        out_fd.write(self.local_header(length, crc, self.HEADER_PADDING, name))
+        out_fd.seek(0, os.SEEK_END)
+
+    def update(self):
+        """Save the changes into the source file, writing only the pages they touched.
+
+        The header plist and the database's local header are rewritten, with
+        the padding resized so the payload stays where it is. The changes are
+        committed to the document's database in WAL mode and only the pages
+        in the WAL are written, at their offset in the payload; the payload's
+        CRC is updated from the old and new bytes of those pages, so nothing
+        else is read or rewritten. If the header no longer fits, a grown
+        database is followed by another section, or the database was last
+        saved to another file (so the WAL does not hold every page that
+        differs from this one), the whole file is rewritten with write() instead.
+        """
+        if self.container is None:
+            raise ValueError('No source file to update; use write().')
+
+        pxm_fp1 = self.container.pxm_fp1
+        section1 = self.container.sql_section()
+        header = self.header_bytes()
+        sql_db = self.commit()
+        page_size, n_pages, pages = sql_db.committed_pages()
+        length = n_pages * page_size
+        old_pages = section1.length // page_size
+        name_len = len(section1.name.encode('utf-8'))
+        extra_len = section1.data_offset - (12 + len(header) + PXMContainer.LOCAL_HEADER.size + name_len)
+        with open(pxm_fp1, 'rb') as pxm_fd1:
+            pxm_fd1.seek(section1.header_offset)
+            local1 = PXMContainer.LOCAL_HEADER.unpack(pxm_fd1.read(PXMContainer.LOCAL_HEADER.size))
+        flags, crc = local1[2], local1[6]
+        if sql_db.synced_fp1 != os.path.abspath(pxm_fp1) or \
+                section1.compression or flags & 0x08 or not (extra_len == 0 or extra_len >= 4) or \
+                section1.length % page_size or length < section1.length or \
+                (length != section1.length and section1 is not self.container.sections[-1]) or \
+                not all(p in pages for p in range(old_pages + 1, n_pages + 1)):
+            return self.write_file(pxm_fp1, header, sql_db)
+
+        with _profile_stage('writer_pages', pages=len(pages)) as count1, open(pxm_fp1, 'r+b') as pxm_fd1:
+            for pgno in sorted(pages):
+                page = pages[pgno] = _rollback_page(pages[pgno]) if pgno == 1 else pages[pgno]
+                if pgno > old_pages:
+                    crc = zlib.crc32(page, crc)
+                    continue
+                offset = (pgno - 1) * page_size
+                pxm_fd1.seek(section1.data_offset + offset)
+                old_page = pxm_fd1.read(page_size)
+                if old_page == page:
+                    pages[pgno] = None
+                    continue
+                # CRC-32 is affine: the old CRC changes by the pages' CRCs xored, moved past the rest of the payload.
+                crc ^= _crc32_shift(zlib.crc32(old_page) ^ zlib.crc32(page), section1.length - offset - page_size)
+
+            pxm_fd1.seek(0)
+            pxm_fd1.write(b'PXMDMETA' + struct.pack('<i', len(header)) + header +
+                          self.local_header(length, crc, extra_len, section1.name))
+            for pgno, page in sorted(pages.items()):
+                if page is not None:
+                    pxm_fd1.seek(section1.data_offset + (pgno - 1) * page_size)
+                    pxm_fd1.write(page)
+                    count1(bytes=page_size)
+
+        sql_db.checkpoint()
+        self.container = PXMContainer(pxm_fp1)
+        self.pxm_fo.header_bytes = header
+        self.written()
+
+    def written(self):
+        if self.pxm_fo._doc_info is not None:
+            for name in self.document_info:
+                self.pxm_fo._doc_info._values.pop(name, None)
+        self.document_info = {}
+        if self.pxm_fo.sql_db is not None:
+            for traits1 in self.pxm_fo.sql_db.changed_traits:
+                traits1.changed.clear()
+            del self.pxm_fo.sql_db.changed_traits[:]
+
+
+def _rollback_page(page1):
+    """Page 1 with the file format bytes set back to rollback journal mode, as the payload is read without a WAL."""
+    return page1[:18] + b'\x01\x01' + page1[20:]
+
+
+def _gf2_times(matrix, vector):
+    total = 0
+    for row1 in matrix:
+        if not vector:
+            break
+        if vector & 1:
+            total ^= row1
+        vector >>= 1
+    return total
+
+
+def _crc32_shift(crc, n_bytes):
+    """The CRC-32 register `crc` advanced over `n_bytes` zero bytes without the init / final xor (as zlib's
+    crc32_combine does), i.e. the linear part of appending that many zeros."""
+    # Operator for one zero bit, then squared up to one zero byte.
+    matrix = [0xEDB88320] + [1 << n for n in range(31)]
+    for _ in range(3):
+        matrix = [_gf2_times(matrix, row1) for row1 in matrix]
+    while n_bytes:
+        if n_bytes & 1:
+            crc = _gf2_times(matrix, crc)
+        n_bytes >>= 1
+        if n_bytes:
+            matrix = [_gf2_times(matrix, row1) for row1 in matrix]
+    return crc
+
+
+def _doc_text(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def _doc_number(value):
+    value = _doc_text(value)
+    if isinstance(value, (int, float)):
+        return value
+    return int(value) if value.strip().lstrip('-+').isdigit() else float(value)
+
+
+def _doc_date(value):
+    """Save dates are seconds since the Cocoa reference date, 2001-01-01 UTC."""
+    return BPlistReader.EPOCH + datetime.timedelta(seconds=_doc_number(value))
+
+
+def _doc_plist(value):
+    """A bplist blob, decoded through archive_cache if it is a keyed archive (so it is shared and read-only)."""
+    if not isinstance(value, bytes) or not value.startswith(b'bplist'):
+        return value
+    plist1 = biplist.readPlistFromString(value)
+    if isinstance(plist1, dict) and '$archiver' in plist1:
+        return archive_cache.load(value)
+    return plist1
+
+
+class _DocInfoField(object):
+    """A PXMDocInfo property: one document_info row, selected and decoded on first access, then cached."""
+
+    def __init__(self, key, decode):
+        self.key = key
+        self.decode = decode
+
+    def __get__(self, doc_info, owner):
+        if doc_info is None:
+            return self
+        try:
+            return doc_info._values[self.key]
+        except KeyError:
+            pass
+        raw = doc_info.sql_db.document_info_value(self.key)
+        doc_info._values[self.key] = value = None if raw is None else self.decode(raw)
+        return value
+
+
+class PXMDocInfo(object):
+    """Typed document_info values. Each property reads its own row the first time it is used; missing keys are None.
+
+    Sizes are (w, h) tuples, numbers int or float, save_date a naive UTC
+    datetime, color_profile the shared PXMICCProfile, and plist blobs come
+    back decoded.
+    """
+
+    def __init__(self, sql_db):
+        self.sql_db = sql_db
+        self._values = {}
+
+    def keys(self):
+        return [r[0] for r in self.sql_db.conn.execute("SELECT name from document_info;")]
+
+    document_id = _DocInfoField('PTImageIOFormatDocumentIDInfoKey', _doc_text)
+    size = _DocInfoField('PTImageIOFormatDocumentSizeInfoKey', parse_geometry_string)
+    resolution = _DocInfoField('PTImageIOFormatDocumentResolutionSizeInfoKey', parse_geometry_string)
+    resolution_units = _DocInfoField('PTImageIOFormatDocumentResolutionUnitsInfoKey', _doc_number)
+    bits_per_component = _DocInfoField('PTImageIOFormatDocumentBitsPerComponentInfoKey', _doc_number)
+    number_of_components = _DocInfoField('PTImageIOFormatDocumentNumberOfComponentsInfoKey', _doc_number)
+    bitmap_data_format = _DocInfoField('PTImageIOFormatDocumentBitmapDataFormatInfoKey', _doc_number)
+    save_date = _DocInfoField('PTImageIOFormatDocumentSaveDateInfoKey', _doc_date)
+    color_profile = _DocInfoField('PTImageIOFormatDocumentColorsyncProfileInfoKey', icc_profiles.intern)
+    keywords = _DocInfoField('PTImageIOFormatDocumentKeywordsInfoKey', _doc_plist)
+    guides = _DocInfoField('PTImageIOFormatDocumentGuidesInfoKey', _doc_plist)
+    layers_linking = _DocInfoField('PTImageIOFormatDocumentLayersLinkingInfoKey', _doc_plist)
+    selected_layers = _DocInfoField('PTImageIOFormatDocumentSelectedLayersInfoKey', _doc_plist)
+    viewing_options = _DocInfoField('PTImageIOFormatDocumentViewingOptionsInfoKey_PTImageIOPlatformMacOS', _doc_plist)
+    custom_data = _DocInfoField('PTImageIOFormatDocumentCustomDataInfoKey', _doc_plist)
+    original_exif = _DocInfoField('PTImageIOFormatDocumentOriginalExifDictionaryInfoKey', _doc_plist)
+    file_version_support = _DocInfoField('PTImageIOFormatDocumentFileVersionSupportInfoKey', _doc_plist)
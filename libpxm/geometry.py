@@ -0,0 +1,57 @@
+from __future__ import print_function, unicode_literals
+import re
+
+__author__ = 'Ethan Randall'
+
+
+_GEO_NUM = r'\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*'
+_GEO_PAIR = r'\s*\{' + _GEO_NUM + ',' + _GEO_NUM + r'\}\s*'
+_GEO_PAIR_RE = re.compile(_GEO_PAIR + r'\Z')
+_GEO_RECT_RE = re.compile(r'\s*\{' + _GEO_PAIR + ',' + _GEO_PAIR + r'\}\s*\Z')
+_GEO_CACHE = {}
+_GEO_CACHE_MAX = 4096
+
+
+def _geo_number(num_str):
+    if '.' in num_str or 'e' in num_str or 'E' in num_str:
+        return float(num_str)
+    return int(num_str)
+
+
+def parse_geometry_string(geo_str):
+    """Parse an NSPoint/NSSize ('{x, y}') or NSRect ('{{x, y}, {w, h}}') string into tuples.
+
+    Results are memoized per string, since documents repeat the same few sizes.
+    """
+    if isinstance(geo_str, bytes):
+        geo_str = geo_str.decode('utf-8')
+    try:
+        return _GEO_CACHE[geo_str]
+    except KeyError:
+        pass
+
+    m1 = _GEO_PAIR_RE.match(geo_str)
+    if m1:
+        geo = (_geo_number(m1.group(1)), _geo_number(m1.group(2)))
+    else:
+        m1 = _GEO_RECT_RE.match(geo_str)
+        if not m1:
+            raise ValueError('Not a geometry string: %r' % geo_str)
+        nums = [_geo_number(g) for g in m1.groups()]
+        geo = ((nums[0], nums[1]), (nums[2], nums[3]))
+
+    if len(_GEO_CACHE) >= _GEO_CACHE_MAX:
+        _GEO_CACHE.clear()
+    _GEO_CACHE[geo_str] = geo
+    return geo
+
+
+def _geo_format(num):
+    return '%d' % num if float(num).is_integer() else repr(float(num))
+
+
+def format_geometry_string(geo):
+    """The inverse of parse_geometry_string: (x, y) -> '{x, y}', ((x, y), (w, h)) -> '{{x, y}, {w, h}}'."""
+    if isinstance(geo[0], (tuple, list)):
+        return '{%s, %s}' % (format_geometry_string(geo[0]), format_geometry_string(geo[1]))
+    return '{%s, %s}' % (_geo_format(geo[0]), _geo_format(geo[1]))
@@ -0,0 +1,94 @@
+from __future__ import print_function, unicode_literals
+import biplist
+import mmap
+import struct
+
+from .archive import NSArchivedPlist, BPlistReader
+from .profile import PXMProfile, _profile_stage
+
+__author__ = 'Ethan Randall'
+
+
+class PXMHeader(object):
+    """The PXMDMETA header of a .pxm, read straight from an mmap of the file.
+
+    Only the archive objects needed for the keys you ask for are decoded:
+
+        with PXMHeader(path) as h1:
+            names = h1['PTImageIOFormatBasicMetaLayerNamesInfoKey']
+    """
+
+    def __init__(self, pxm_fp1):
+        self._fd = open(pxm_fp1, 'rb')
+        try:
+            self._mm = mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._fd.close()
+            raise
+
+        try:
+            assert self._mm[:8] == b'PXMDMETA', 'Invalid magic number.'
+            self.length = struct.unpack_from('<i', self._mm, 8)[0]
+            self.plist = BPlistReader(self._mm, 12, self.length)
+            self.archive = NSArchivedPlist()
+            self.archive.arc_plist = self.plist.top()
+        except Exception:
+            self.close()
+            raise
+
+    def keys(self):
+        return self.archive.root_keys()
+
+    def get(self, key, default=None):
+        return self.archive.root_get(key, default)
+
+    def __getitem__(self, key):
+        value = self.archive.root_get(key, KeyError)
+        if value is KeyError:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def close(self):
+        # Drop decoded views first; they may slice the mmap.
+        self.plist = self.archive = None
+        if getattr(self, '_mm', None) is not None:
+            self._mm.close()
+            self._mm = None
+        self._fd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_header_archive(pxm_fd1):
+    """Read and decode the header plist from the start of an open .pxm; returns (plist bytes, NSArchivedPlist)."""
+    with _profile_stage('header_read') as count1:
+        assert (struct.unpack('<8s', pxm_fd1.read(8))[0] == b'PXMDMETA'), 'Invalid magic number.'
+        h_pl_len = struct.unpack('<i', pxm_fd1.read(4))[0]
+
+        plist_bytes = pxm_fd1.read(h_pl_len)
+        count1(bytes=12 + len(plist_bytes))
+
+    with _profile_stage('header_parse'):
+        h_pl = biplist.readPlistFromString(plist_bytes)
+
+    with _profile_stage('header_decode') as count1:
+        ap1 = NSArchivedPlist.load(h_pl)
+        count1(objects=len(ap1.uids))
+
+    return plist_bytes, ap1
+
+
+def read_header(pxm_fp1):
+    """Return the decoded PXMDMETA header plist of a .pxm; the SQLite section is never read."""
+    prof1 = PXMProfile.current()
+    if prof1 is not None:
+        prof1.opens += 1
+    with open(pxm_fp1, 'rb') as pxm_fd1:
+        return read_header_archive(pxm_fd1)[1].real_plist
@@ -0,0 +1,244 @@
+from __future__ import print_function, unicode_literals
+import biplist
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+import uuid
+
+from . import _LAYER_TYPES
+from .archive import NSArchivedPlist, archive_cache
+from .geometry import parse_geometry_string
+
+__author__ = 'Ethan Randall'
+
+
+class PXMLayerTraits(MutableMapping):
+    """The layer_info rows of one layer, fetched from the database one key at a time.
+
+    Listing the keys only reads the name column, unless `names` (and small
+    `values`) were already read for every layer at once, as
+    PXMFile.iter_layers() does; a value blob is selected the first time its
+    key is looked up and kept afterwards. Keys set or deleted
+    are listed in `changed` until a PXMFileWriter saves them; the traits also
+    register with their database then, so changes to layers that are not in
+    PXMFile.layers (from iter_layers(), or load_layers=False) are saved too.
+    """
+    __slots__ = ('sql_db', 'layer_uuid', '_names', '_values', 'changed')
+
+    def __init__(self, sql_db, layer_uuid, names=None, values=None):
+        self.sql_db = sql_db
+        self.layer_uuid = layer_uuid
+        self._names = None if names is None else list(names)
+        self._values = {} if values is None else dict(values)
+        self.changed = set()
+
+    @property
+    def names(self):
+        if self._names is None:
+            self._names = [r[0] for r in self.sql_db.conn.execute(
+                "SELECT name from layer_info WHERE layer_uuid = ?;", (self.layer_uuid,))]
+        return self._names
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            row1 = self.sql_db.conn.execute(
+                "SELECT value from layer_info WHERE layer_uuid = ? AND name = ?;", (self.layer_uuid, key)).fetchone()
+            if row1 is None:
+                raise KeyError(key)
+            self._values[key] = row1[0]
+        return self._values[key]
+
+    def __setitem__(self, key, value):
+        if key not in self.names:
+            self._names.append(key)
+        self._values[key] = value
+        self._change(key)
+
+    def __delitem__(self, key):
+        if key not in self.names:
+            raise KeyError(key)
+        self._names.remove(key)
+        self._values.pop(key, None)
+        self._change(key)
+
+    def _change(self, key):
+        if not self.changed:
+            self.sql_db.changed_traits.append(self)
+        self.changed.add(key)
+
+    def __contains__(self, key):
+        return key in self._values or key in self.names
+
+    def __iter__(self):
+        return iter(list(self.names))
+
+    def __len__(self):
+        return len(self.names)
+
+
+class PXMLayer(object):
+    __slots__ = ('uuid', 'parent_uuid', '_index_at_parent', '_type', 'traits', '_trait_plist', '_state_plist')
+
+    def __init__(self, layer_uuid=None):
+        self.uuid = uuid.uuid4() if layer_uuid is None else layer_uuid
+        self.parent_uuid = None
+        self._index_at_parent = -1
+        self._type = None
+        self.traits = {}
+        self._trait_plist = NotImplemented
+        self._state_plist = NotImplemented
+
+    @classmethod
+    def from_row(cls, *cols):
+        assert len(cols) == 4, 'Expected 4 columns'
+        nlayer = cls(cols[0])
+        nlayer.parent_uuid = cols[1]
+        nlayer.index_at_parent = cols[2]
+        nlayer.type = cols[3]
+        return nlayer
+
+    @property
+    def index_at_parent(self):
+        if self._index_at_parent == -1:
+            raise AttributeError(self._index_at_parent)
+        else:
+            return self._index_at_parent
+
+    @index_at_parent.setter
+    def index_at_parent(self, value):
+        if isinstance(value, int) and value >= 0:
+            self._index_at_parent = value
+        else:
+            raise ValueError('Not a valid index!')
+
+    @property
+    def type(self):
+        if self._type is None:
+            raise AttributeError(self._type)
+        else:
+            return self._type
+
+    @type.setter
+    def type(self, value):
+        self._type = self.full_type(value)
+
+    @staticmethod
+    def full_type(value):
+        try:
+            return _LAYER_TYPES[value]
+        except KeyError:
+            raise ValueError('Not a valid layer type!')
+
+    @property
+    def name(self):
+        return self.traits.get('PTImageIOFormatLayerNameInfoKey')
+
+    BITMAP_DATA_KEY = 'PTImageIOFormatLayerBitmapDataInfoKey'
+    PIXEL_DTYPES = {8: '|u1', 16: '<u2', 32: '<f4'}
+
+    def _pixel_layout(self, components=None, bits_per_component=None):
+        has_bitmap = self.traits.get('PTImageIOFormatLayerHasBitmapDataInfoKey')
+        if has_bitmap in (0, False, '0', b'0') or self.BITMAP_DATA_KEY not in self.traits:
+            raise ValueError('Layer %s has no bitmap data.' % self.uuid)
+
+        width, height = parse_geometry_string(self.traits['PTImageIOFormatLayerSizeInfoKey'])
+        sql_db = getattr(self.traits, 'sql_db', None)
+        if components is None:
+            components = sql_db.document_info_value('PTImageIOFormatDocumentNumberOfComponentsInfoKey')
+        if bits_per_component is None:
+            bits_per_component = sql_db.document_info_value('PTImageIOFormatDocumentBitsPerComponentInfoKey')
+        return int(width), int(height), int(components), self.PIXEL_DTYPES[int(bits_per_component)]
+
+    @staticmethod
+    def _pixel_array(buf, n_rows, width, components, dtype, row_bytes):
+        import numpy
+        dtype = numpy.dtype(dtype)
+        # Rows may be padded past width * components, so shape the view with explicit strides.
+        return numpy.ndarray((n_rows, width, components), dtype, buffer=buf,
+                             strides=(row_bytes, components * dtype.itemsize, dtype.itemsize))
+
+    def pixels(self, components=None, bits_per_component=None):
+        """Return the layer bitmap as a read-only H x W x C NumPy array that views the blob without copying.
+
+        Components and bits per component default to the document's values.
+        """
+        width, height, components, dtype = self._pixel_layout(components, bits_per_component)
+        buf = memoryview(self.traits[self.BITMAP_DATA_KEY])
+        return self._pixel_array(buf, height, width, components, dtype, len(buf) // height)
+
+    def bitmap_blob(self):
+        """(rowid, byte length) of the bitmap in layer_info, or None if the layer has no database behind it."""
+        sql_db = getattr(self.traits, 'sql_db', None)
+        if sql_db is None:
+            return None
+        try:
+            return sql_db.layer_info_blobs(self.BITMAP_DATA_KEY, self.uuid)[self.uuid]
+        except KeyError:
+            raise KeyError(self.BITMAP_DATA_KEY)
+
+    def pixel_rows(self, y0, y1, components=None, bits_per_component=None, blob=None):
+        """Return bitmap rows y0 to y1 (exclusive) as an array, reading only that part of the blob.
+
+        `blob` is the layer's bitmap_blob(), when the caller already has it.
+        """
+        width, height, components, dtype = self._pixel_layout(components, bits_per_component)
+        y0, y1 = max(y0, 0), min(y1, height)
+        sql_db = getattr(self.traits, 'sql_db', None)
+        if sql_db is None:
+            return self.pixels(components, bits_per_component)[y0:y1]
+
+        rowid, blob_len = blob or self.bitmap_blob()
+        row_bytes = blob_len // height
+        buf = sql_db.read_layer_info_range(rowid, y0 * row_bytes, (y1 - y0) * row_bytes)
+        return self._pixel_array(buf, y1 - y0, width, components, dtype, row_bytes)
+
+    def iter_pixel_rows(self, band_height=256, components=None, bits_per_component=None):
+        """Yield (y, band) pairs covering the bitmap, reading `band_height` rows of the blob at a time.
+
+        Only one band is held in memory, which suits layers too large for pixels().
+        """
+        width, height, components, dtype = self._pixel_layout(components, bits_per_component)
+        blob = self.bitmap_blob()
+        for y in range(0, height, band_height):
+            yield y, self.pixel_rows(y, y + band_height, components, bits_per_component, blob)
+
+    @property
+    def trait_plist(self):
+        if self._trait_plist is NotImplemented:
+            self.parse_trait_plist()
+        return self._trait_plist
+
+    @trait_plist.setter
+    def trait_plist(self, value):
+        self._trait_plist = value
+
+    @property
+    def state_plist(self):
+        if self._state_plist is NotImplemented:
+            self.parse_trait_plist()
+        return self._state_plist
+
+    @state_plist.setter
+    def state_plist(self, value):
+        self._state_plist = value
+
+    def store_trait_plist(self, trait_plist, state_plist=None):
+        """Archive `trait_plist` into the layer's PTImageIOFormatLayerSpecificDataInfoKey.
+
+        With `state_plist`, it is archived as the trait plist's _STATE_DATA_.
+        Shared plists from trait_plist are read-only; edit a copy made with thaw().
+        """
+        if state_plist is not None:
+            trait_plist = dict(trait_plist)
+            trait_plist['_STATE_DATA_'] = biplist.Data(NSArchivedPlist.dumps(state_plist))
+        self.traits['PTImageIOFormatLayerSpecificDataInfoKey'] = biplist.Data(NSArchivedPlist.dumps(trait_plist))
+        self._trait_plist = self._state_plist = NotImplemented
+
+    def parse_trait_plist(self):
+        self._trait_plist = None
+        self._state_plist = None
+        if 'PTImageIOFormatLayerSpecificDataInfoKey' in self.traits:
+            self._trait_plist = archive_cache.load(self.traits['PTImageIOFormatLayerSpecificDataInfoKey'])
+            if '_STATE_DATA_' in self._trait_plist.keys():
+                self._state_plist = archive_cache.load(self._trait_plist['_STATE_DATA_'])
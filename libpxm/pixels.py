@@ -0,0 +1,214 @@
+from __future__ import print_function, unicode_literals
+import struct
+
+from .geometry import parse_geometry_string
+from .layers import PXMLayer
+
+__author__ = 'Ethan Randall'
+
+
+def _info_number(value, default):
+    if value is None:
+        return default
+    if isinstance(value, bytes):
+        value = value.decode('utf-8')
+    return float(value)
+
+
+def _info_flag(value, default):
+    if value is None:
+        return default
+    if isinstance(value, bytes):
+        value = value.decode('utf-8')
+    if isinstance(value, type('')):
+        if value.strip().lower() in ('yes', 'true'):
+            return True
+        if value.strip().lower() in ('no', 'false', ''):
+            return False
+    return bool(float(value))
+
+
+def _fourcc(code):
+    return struct.unpack('>I', code.encode('ascii'))[0]
+
+
+def _hard_light(cb, cs):
+    import numpy
+    return numpy.where(cs <= 0.5, cb * 2 * cs, cb + (2 * cs - 1) - cb * (2 * cs - 1))
+
+
+def _darken(cb, cs):
+    import numpy
+    return numpy.minimum(cb, cs)
+
+
+def _lighten(cb, cs):
+    import numpy
+    return numpy.maximum(cb, cs)
+
+
+def _linear_dodge(cb, cs):
+    import numpy
+    return numpy.minimum(cb + cs, 1.0)
+
+
+class PXMCompositor(object):
+    """Flattens a PXMFile by compositing its bitmap layers band by band.
+
+    Layers are drawn bottom-up in index_at_parent order (index 0 at the
+    bottom). A layer with children is composited as a group: its own bitmap
+    and children are flattened on their own, then blended into the parent with
+    the group's opacity and blend mode. Clipping-mask layers are limited to
+    the alpha of the nearest non-clipping layer below them. Vector layers
+    cannot be rasterised and are skipped.
+
+    Work is done on horizontal bands of `tile_height` rows that span the
+    canvas. Each layer contributes only the rows of its blob that overlap the
+    band, so peak memory is a few bands rather than the whole document.
+    Bitmaps are assumed to store straight (non-premultiplied) alpha.
+    """
+
+    OPACITY_KEY = 'PTImageIOFormatLayerOpacityInfoKey'
+    BLEND_MODE_KEY = 'PTImageIOFormatLayerBlendModeInfoKey'
+    VISIBLE_KEY = 'PTImageIOFormatLayerIsVisibleInfoKey'
+    ORIGIN_KEY = 'PTImageIOFormatLayerOriginInfoKey'
+    CLIPPING_MASK_KEY = 'PTImageIOFormatLayerIsClippingMaskInfoKey'
+
+    NORMAL = _fourcc('norm')
+
+    #  FourCC blend mode -> B(cb, cs) on straight colours, per the W3C separable blend modes
+    BLEND_FUNCS = {
+        _fourcc('norm'): lambda cb, cs: cs,
+        _fourcc('mul '): lambda cb, cs: cb * cs,
+        _fourcc('scrn'): lambda cb, cs: cb + cs - cb * cs,
+        _fourcc('over'): lambda cb, cs: _hard_light(cs, cb),
+        _fourcc('hLit'): _hard_light,
+        _fourcc('dark'): _darken,
+        _fourcc('lite'): _lighten,
+        _fourcc('diff'): lambda cb, cs: abs(cb - cs),
+        _fourcc('lddg'): _linear_dodge,
+    }
+
+    def __init__(self, pxm_file):
+        self.pxm_file = pxm_file
+        if not pxm_file.layers_dict:
+            pxm_file.layers.extend(pxm_file.iter_layers())
+            pxm_file.build_layer_dict()
+
+        sql_db = pxm_file.sql_db
+        self.width, self.height = [int(n) for n in parse_geometry_string(
+            sql_db.document_info_value('PTImageIOFormatDocumentSizeInfoKey'))]
+        self.components = int(sql_db.document_info_value('PTImageIOFormatDocumentNumberOfComponentsInfoKey'))
+        self.bits_per_component = int(sql_db.document_info_value('PTImageIOFormatDocumentBitsPerComponentInfoKey'))
+        self.plans = {}
+        self.bitmap_blobs = None
+
+    def plan(self, l1):
+        """Per-layer drawing parameters, read from layer_info once per flatten; None if the layer is hidden."""
+        if l1.uuid in self.plans:
+            return self.plans[l1.uuid]
+
+        t1 = l1.traits
+        plan1 = None
+        if _info_flag(t1.get(self.VISIBLE_KEY), True):
+            try:
+                width, height = l1._pixel_layout(self.components, self.bits_per_component)[:2]
+            except (ValueError, KeyError):
+                width = height = None
+            if width is not None and self.bitmap_blobs is None:
+                # One query for every layer's bitmap rowid and length, rather than one per layer per band.
+                self.bitmap_blobs = self.pxm_file.sql_db.layer_info_blobs(PXMLayer.BITMAP_DATA_KEY)
+            x, y = parse_geometry_string(t1[self.ORIGIN_KEY]) if self.ORIGIN_KEY in t1 else (0, 0)
+            plan1 = {'layer': l1, 'blob': self.bitmap_blobs.get(l1.uuid) if width is not None else None,
+                     'x': int(x), 'y': int(y), 'width': width, 'height': height,
+                     'opacity': _info_number(t1.get(self.OPACITY_KEY), 1.0),
+                     'blend': self.BLEND_FUNCS.get(int(_info_number(t1.get(self.BLEND_MODE_KEY), self.NORMAL)),
+                                                   self.BLEND_FUNCS[self.NORMAL]),
+                     'clipped': _info_flag(t1.get(self.CLIPPING_MASK_KEY), False)}
+        self.plans[l1.uuid] = plan1
+        return plan1
+
+    def layer_band(self, plan1, y0, y1):
+        """The layer's pixels for canvas rows y0..y1 as premultiplied float RGBA, or None if it misses the band."""
+        import numpy
+        ly0, ly1 = max(y0, plan1['y']) - plan1['y'], min(y1, plan1['y'] + plan1['height']) - plan1['y']
+        lx0, lx1 = max(0, -plan1['x']), min(plan1['width'], self.width - plan1['x'])
+        if ly0 >= ly1 or lx0 >= lx1:
+            return None
+
+        src = plan1['layer'].pixel_rows(ly0, ly1, self.components, self.bits_per_component, plan1['blob'])[:, lx0:lx1]
+        scale = 1.0 if src.dtype.kind == 'f' else float(numpy.iinfo(src.dtype).max)
+        src = src.astype(numpy.float32) / scale
+        if src.shape[2] < 3:
+            src = numpy.concatenate([src[..., :1]] * 3 + [src[..., 1:]], axis=2)
+        if src.shape[2] == 3:
+            src = numpy.concatenate([src, numpy.ones(src.shape[:2] + (1,), numpy.float32)], axis=2)
+        src[..., :3] *= src[..., 3:4]
+
+        band = numpy.zeros((y1 - y0, self.width, 4), numpy.float32)
+        band[ly0 + plan1['y'] - y0:ly1 + plan1['y'] - y0, lx0 + plan1['x']:lx1 + plan1['x']] = src
+        return band
+
+    @staticmethod
+    def blend(dst, src, opacity, blend_func):
+        """Composite premultiplied `src` over premultiplied `dst` in place."""
+        import numpy
+        src_a = src[..., 3:4] * opacity
+        dst_a = dst[..., 3:4]
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            cs = numpy.where(src[..., 3:4] > 0, src[..., :3] / src[..., 3:4], 0)
+            cb = numpy.where(dst_a > 0, dst[..., :3] / dst_a, 0)
+        mixed = (1 - dst_a) * cs + dst_a * blend_func(cb, cs)
+        dst[..., :3] = src_a * mixed + (1 - src_a) * dst[..., :3]
+        dst[..., 3:4] = src_a + dst_a * (1 - src_a)
+
+    def composite_group(self, parent_uuid, y0, y1, dst):
+        import numpy
+        clip_alpha = None
+        for l1 in self.pxm_file.children(parent_uuid):
+            plan1 = self.plan(l1)
+            if plan1 is None:
+                continue
+
+            src = None
+            if plan1['width'] is not None:
+                src = self.layer_band(plan1, y0, y1)
+            if self.pxm_file.children(l1.uuid):
+                group = numpy.zeros_like(dst) if src is None else src
+                self.composite_group(l1.uuid, y0, y1, group)
+                src = group
+            if src is None:
+                if not plan1['clipped']:
+                    clip_alpha = 0.0
+                continue
+
+            if plan1['clipped']:
+                if clip_alpha is not None:
+                    src *= clip_alpha
+            else:
+                clip_alpha = src[..., 3:4] * plan1['opacity']
+            self.blend(dst, src, plan1['opacity'], plan1['blend'])
+
+    def iter_bands(self, tile_height=256):
+        """Yield (y, band) with each band a premultiplied float32 RGBA array of up to `tile_height` rows."""
+        import numpy
+        for y0 in range(0, self.height, tile_height):
+            y1 = min(y0 + tile_height, self.height)
+            band = numpy.zeros((y1 - y0, self.width, 4), numpy.float32)
+            self.composite_group(None, y0, y1, band)
+            yield y0, band
+
+    def flatten(self, tile_height=256):
+        """Return the flattened document as straight-alpha RGBA in the document's pixel type."""
+        import numpy
+        dtype = numpy.dtype(PXMLayer.PIXEL_DTYPES[self.bits_per_component])
+        out = numpy.empty((self.height, self.width, 4), dtype)
+        scale = 1.0 if dtype.kind == 'f' else float(numpy.iinfo(dtype).max)
+        for y0, band in self.iter_bands(tile_height):
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                band[..., :3] = numpy.where(band[..., 3:4] > 0, band[..., :3] / band[..., 3:4], 0)
+            band *= scale
+            if dtype.kind != 'f':
+                band = numpy.rint(band)
+            out[y0:y0 + band.shape[0]] = band
+        return out
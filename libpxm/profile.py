@@ -0,0 +1,112 @@
+from __future__ import print_function, unicode_literals
+from collections import OrderedDict
+import contextlib
+import functools
+import json
+import threading
+import time
+
+__author__ = 'Ethan Randall'
+
+
+class PXMProfile(object):
+    """Per-stage wall time and counters for .pxm opens; nothing is recorded unless a profile is active.
+
+    Everything read on this thread inside the block is recorded:
+
+        with PXMProfile() as prof1:
+            PXMFileReader(path)
+        print(prof1.to_json())
+
+    Each stage keeps calls and seconds, plus counters such as bytes, objects
+    (archive objects decoded), rows, hits and misses. Stages can nest; an
+    outer stage's seconds include the inner ones. Profiles from a batch are
+    combined with merge() or PXMProfile.aggregate(), which also accept the
+    to_dict() form, e.g. from worker processes.
+    """
+
+    _local = threading.local()
+
+    def __init__(self):
+        self.opens = 0
+        self.stages = OrderedDict()
+
+    @classmethod
+    def current(cls):
+        stack = getattr(cls._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    def __enter__(self):
+        self._local.__dict__.setdefault('stack', []).append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._local.stack.remove(self)
+
+    def count(self, name, **counters):
+        """Add `counters` to stage `name` without timing anything."""
+        stage1 = self.stages.get(name)
+        if stage1 is None:
+            stage1 = self.stages[name] = OrderedDict([('calls', 0), ('seconds', 0.0)])
+        for key, value in counters.items():
+            stage1[key] = stage1.get(key, 0) + value
+        return stage1
+
+    @contextlib.contextmanager
+    def stage(self, name, **counters):
+        """Time a block as stage `name`; it gets a function that adds counters to the stage."""
+        stage1 = self.count(name, **counters)
+        t0 = time.time()
+        try:
+            yield functools.partial(self.count, name)
+        finally:
+            stage1['seconds'] += time.time() - t0
+            stage1['calls'] += 1
+
+    def merge(self, other):
+        """Add another profile (or its to_dict()) into this one."""
+        if isinstance(other, PXMProfile):
+            other = other.to_dict()
+        self.opens += other.get('opens', 0)
+        for name, stage1 in other.get('stages', {}).items():
+            self.count(name, **stage1)
+        return self
+
+    @classmethod
+    def aggregate(cls, profiles):
+        prof1 = cls()
+        for other in profiles:
+            prof1.merge(other)
+        return prof1
+
+    def to_dict(self):
+        return {'opens': self.opens, 'stages': OrderedDict((k, dict(v)) for k, v in self.stages.items())}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+
+def _no_count(**counters):
+    pass
+
+
+class _NoStage(object):
+    def __enter__(self):
+        return _no_count
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def _profile_stage(name, **counters):
+    prof1 = PXMProfile.current()
+    return _NO_STAGE if prof1 is None else prof1.stage(name, **counters)
+
+
+def _profile_count(name, **counters):
+    prof1 = PXMProfile.current()
+    if prof1 is not None:
+        prof1.count(name, **counters)
@@ -0,0 +1,338 @@
+from __future__ import print_function, unicode_literals
+import sqlite3
+import struct
+import tempfile
+import shutil
+import mmap
+import os
+import os.path
+import time
+import pickle
+import hashlib
+import threading
+
+from .profile import _profile_stage
+
+__author__ = 'Ethan Randall'
+
+
+class PXMSqlDB(object):
+    T_NAMES = ('document_info', 'document_layer', 'layer_info')
+    WAL_HEADER = struct.Struct('>IIIIIIII')
+    WAL_FRAME_HEADER = struct.Struct('>IIIIII')
+    # Payloads up to this many bytes are opened in memory; larger ones from a temp file (see from_file).
+    MEMORY_LIMIT = 32 * 1024 * 1024
+
+    def __init__(self, sql_db_bytes=None):
+        self._conn = None
+        self._pending = None
+        self._source = None
+        self.cursor = None
+        self.temp_fn = None
+        self.wal = False
+        # Absolute path of the .pxm whose payload holds what was last checkpointed, if any; see make_writable.
+        self.synced_fp1 = None
+        # PXMLayerTraits with unsaved changes, however they were created; see PXMFileWriter.apply_changes.
+        self.changed_traits = []
+        if sql_db_bytes is None:
+            return
+
+        with _profile_stage('sql_open', bytes=len(sql_db_bytes), temp_files=1):
+            with tempfile.NamedTemporaryFile(mode='wb', suffix=".db", delete=False) as db_fd:
+                self.temp_fn = os.path.abspath(db_fd.name)
+                db_fd.write(sql_db_bytes)
+
+            self.connect(self.temp_fn)
+
+    @classmethod
+    def from_file(cls, pxm_fp1, offset, length=None, memory_limit=None):
+        """Open the `length` byte SQLite payload (default: to the end) at byte `offset` of a .pxm file.
+
+        A payload of at most `memory_limit` bytes (default MEMORY_LIMIT) is
+        handed to sqlite3.Connection.deserialize (Python 3.11+) from an mmap
+        of the file. That skips the temp file, but SQLite copies the whole
+        payload into its own buffer, so the database takes its size in RAM.
+        Larger payloads, and every payload on older interpreters, are streamed
+        into a temp file in chunks and SQLite pages them in from there.
+        """
+        sdb1 = cls()
+        sdb1.open_file(pxm_fp1, offset, length, memory_limit)
+        return sdb1
+
+    @classmethod
+    def deferred(cls, pxm_fp1, offset, length=None, memory_limit=None):
+        """Like from_file, but the payload is only opened when conn is first used."""
+        sdb1 = cls()
+        sdb1._pending = (pxm_fp1, offset, length, memory_limit)
+        return sdb1
+
+    @property
+    def conn(self):
+        if self._conn is None and self._pending is not None:
+            pending, self._pending = self._pending, None
+            self.open_file(*pending)
+        return self._conn
+
+    def open_file(self, pxm_fp1, offset, length=None, memory_limit=None):
+        self._source = (pxm_fp1, offset, length)
+        with _profile_stage('sql_open') as count1, open(pxm_fp1, 'rb') as pxm_fd1:
+            size = os.fstat(pxm_fd1.fileno()).st_size - offset if length is None else length
+            if hasattr(sqlite3.Connection, 'deserialize') and \
+                    size <= (self.MEMORY_LIMIT if memory_limit is None else memory_limit):
+                pxm_mm1 = mmap.mmap(pxm_fd1.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    payload = memoryview(pxm_mm1)[offset:None if length is None else offset + length]
+                    count1(bytes=len(payload))
+                    try:
+                        self.connect(':memory:')
+                        self._conn.deserialize(payload)
+                    finally:
+                        payload.release()
+                finally:
+                    pxm_mm1.close()
+                self._conn.execute('PRAGMA query_only = ON;')
+
+            else:
+                count1(bytes=self.copy_to_temp(pxm_fd1, offset, length), temp_files=1)
+                self.connect(self.temp_fn)
+
+    def copy_to_temp(self, pxm_fd1, offset, length=None):
+        """Stream the payload into a new temp file (self.temp_fn) in chunks; returns its size."""
+        pxm_fd1.seek(offset)
+        with tempfile.NamedTemporaryFile(mode='wb', suffix=".db", delete=False) as db_fd:
+            self.temp_fn = os.path.abspath(db_fd.name)
+            if length is None:
+                shutil.copyfileobj(pxm_fd1, db_fd)
+            else:
+                while length > 0:
+                    chunk = pxm_fd1.read(min(length, 1024 * 1024))
+                    if not chunk:
+                        break
+                    db_fd.write(chunk)
+                    length -= len(chunk)
+            return db_fd.tell()
+
+    def make_writable(self):
+        """Move the database into a temp file in WAL mode, so changes can be saved page by page.
+
+        An in-memory database is replaced by a copy of its payload streamed
+        from the .pxm (or backed up page by page if it has no source file).
+        Autocheckpointing is off: every page written since the last
+        checkpoint() stays in the WAL for committed_pages() to list. Those
+        pages only describe the changes to a file whose payload matched the
+        checkpointed database, recorded in synced_fp1 by the writer.
+        """
+        if self.wal:
+            return
+        conn = self.conn
+        if self.temp_fn is None:
+            with _profile_stage('sql_make_writable', temp_files=1) as count1:
+                if self._source is not None:
+                    with open(self._source[0], 'rb') as pxm_fd1:
+                        count1(bytes=self.copy_to_temp(pxm_fd1, *self._source[1:]))
+                else:
+                    fd, self.temp_fn = tempfile.mkstemp(suffix='.db')
+                    os.close(fd)
+                    file_conn = sqlite3.connect(self.temp_fn)
+                    try:
+                        conn.backup(file_conn)
+                    finally:
+                        file_conn.close()
+            conn.close()
+            self.connect(self.temp_fn)
+        self._conn.execute('PRAGMA journal_mode = WAL;')
+        self._conn.execute('PRAGMA wal_autocheckpoint = 0;')
+        self.wal = True
+        self.synced_fp1 = None if self._source is None else os.path.abspath(self._source[0])
+
+    def committed_pages(self):
+        """(page size, page count, {page number: bytes}) of the pages committed since the last checkpoint()."""
+        page_size = self.conn.execute('PRAGMA page_size;').fetchone()[0]
+        n_pages = self.conn.execute('PRAGMA page_count;').fetchone()[0]
+        pages = {}
+        if not self.wal or not os.path.exists(self.temp_fn + '-wal'):
+            return page_size, n_pages, pages
+
+        frame_size = self.WAL_FRAME_HEADER.size + page_size
+        with open(self.temp_fn + '-wal', 'rb') as wal_fd:
+            header = wal_fd.read(self.WAL_HEADER.size)
+            if len(header) < self.WAL_HEADER.size:
+                return page_size, n_pages, pages
+            salts = self.WAL_HEADER.unpack(header)[4:6]
+            uncommitted = {}
+            for frame in iter(lambda: wal_fd.read(frame_size), b''):
+                if len(frame) < frame_size:
+                    break
+                pgno, commit_size, salt1, salt2 = self.WAL_FRAME_HEADER.unpack_from(frame)[:4]
+                if (salt1, salt2) != salts:
+                    break
+                uncommitted[pgno] = frame[-page_size:]
+                if commit_size:
+                    pages.update(uncommitted)
+                    uncommitted.clear()
+        return page_size, n_pages, pages
+
+    def checkpoint(self):
+        """Copy the WAL into the temp file and empty it."""
+        if self.wal:
+            self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE);')
+
+    def connect(self, db_fp1):
+        # Not tied to the opening thread, so worker pools (see libpxm.aio) can query it; callers serialize use.
+        self._conn = sqlite3.connect(db_fp1, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self.cursor = self._conn.cursor()
+
+    def document_info_value(self, name):
+        """Return one raw document_info value, or None if the key is missing."""
+        row1 = self.conn.execute("SELECT value from document_info WHERE name = ?;", (name,)).fetchone()
+        return None if row1 is None else row1[0]
+
+    def layer_info_index(self, max_len=1024, layer_query=None, params=()):
+        """{layer uuid: (names, values of at most `max_len` bytes)}, from one pass over layer_info.
+
+        layer_info has no index, so this replaces a table scan per layer;
+        length() does not read the larger values (bitmaps and archives).
+        `layer_query` is a SELECT of the layer uuids to include, with its
+        `params`; by default every layer is.
+        """
+        sql = "SELECT layer_uuid, name, CASE WHEN length(value) <= ? THEN value END from layer_info"
+        if layer_query is not None:
+            sql += " WHERE layer_uuid IN (%s)" % layer_query
+        index = {}
+        for layer_uuid, name, value in self.conn.execute(sql + ';', (max_len,) + tuple(params)):
+            names, values = index.setdefault(layer_uuid, ([], {}))
+            names.append(name)
+            if value is not None:
+                values[name] = value
+        return index
+
+    def layer_info_blobs(self, name, layer_uuid=None):
+        """layer_uuid -> (rowid, byte length) of its `name` value, for every layer or only `layer_uuid`."""
+        sql = "SELECT layer_uuid, rowid, length(value) from layer_info WHERE name = ?"
+        params = (name,)
+        if layer_uuid is not None:
+            sql += " AND layer_uuid = ?"
+            params += (layer_uuid,)
+        return dict((row1[0], tuple(row1[1:])) for row1 in self.conn.execute(sql + ';', params))
+
+    def read_layer_info_range(self, rowid, offset, length):
+        """Read `length` bytes at `offset` of one layer_info value without loading the rest of it."""
+        if hasattr(self.conn, 'blobopen'):
+            with self.conn.blobopen('layer_info', 'value', rowid, readonly=True) as blob1:
+                blob1.seek(offset)
+                return blob1.read(length)
+        return self.conn.execute(
+            "SELECT substr(value, ?, ?) from layer_info WHERE rowid = ?;", (offset + 1, length, rowid)).fetchone()[0]
+
+    def value_digest(self, table, rowid, chunk_size=1024 * 1024):
+        """SHA-1 of one value in `table` ('layer_info' or 'document_info'), read a chunk at a time."""
+        digest = hashlib.sha1()
+        if hasattr(self.conn, 'blobopen'):
+            with self.conn.blobopen(table, 'value', rowid, readonly=True) as blob1:
+                for chunk in iter(lambda: blob1.read(chunk_size), b''):
+                    digest.update(chunk)
+            return digest.digest()
+
+        length = self.conn.execute("SELECT length(CAST(value AS BLOB)) from %s WHERE rowid = ?;" % table,
+                                   (rowid,)).fetchone()[0] or 0
+        for offset in range(0, length, chunk_size):
+            digest.update(self.conn.execute("SELECT substr(CAST(value AS BLOB), ?, ?) from %s WHERE rowid = ?;"
+                                            % table, (offset + 1, chunk_size, rowid)).fetchone()[0])
+        return digest.digest()
+
+    def __del__(self):
+        if self._conn is not None:
+            self._conn.close()
+        if self.temp_fn is not None:
+            for fn in (self.temp_fn, self.temp_fn + '-wal', self.temp_fn + '-shm'):
+                if os.path.exists(fn):
+                    os.remove(fn)
+
+
+class PXMDecodeCache(object):
+    """Decoded .pxm state kept between runs in an SQLite file under `cache_dir`.
+
+    Pass one as PXMFileReader(..., cache=...). Entries are pickled and keyed
+    by absolute path, size and mtime, or by a SHA-1 of the file contents with
+    hash_content=True. Once the stored total exceeds `max_bytes`, the least
+    recently used entries are evicted. hits, misses and evictions count
+    lookups since the cache was opened.
+    """
+
+    FILE_NAME = 'libpxm-cache.db'
+
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024, hash_content=False):
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        self.max_bytes = max_bytes
+        self.hash_content = hash_content
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Shared with worker threads (see libpxm.aio); every use of the connection holds the lock.
+        self.conn = sqlite3.connect(os.path.join(cache_dir, self.FILE_NAME), check_same_thread=False)
+        self._lock = threading.RLock()
+        self.conn.execute("CREATE TABLE IF NOT EXISTS entries "
+                          "(key TEXT PRIMARY KEY, value BLOB, size INTEGER, last_used REAL);")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);")
+        self.conn.commit()
+
+    def file_key(self, pxm_fp1):
+        pxm_fp1 = os.path.abspath(pxm_fp1)
+        if self.hash_content:
+            digest = hashlib.sha1()
+            with open(pxm_fp1, 'rb') as pxm_fd1:
+                for chunk in iter(lambda: pxm_fd1.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            return 'sha1:' + digest.hexdigest()
+
+        st = os.stat(pxm_fp1)
+        mtime_ns = getattr(st, 'st_mtime_ns', None) or int(st.st_mtime * 1e9)
+        return '%s:%d:%d' % (pxm_fp1, st.st_size, mtime_ns)
+
+    def get(self, key):
+        with self._lock:
+            row1 = self.conn.execute("SELECT value from entries WHERE key = ?;", (key,)).fetchone()
+            if row1 is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.conn.execute("UPDATE entries SET last_used = ? WHERE key = ?;", (time.time(), key))
+            self.conn.commit()
+        return pickle.loads(bytes(row1[0]))
+
+    def put(self, key, value):
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?);",
+                              (key, sqlite3.Binary(blob), len(blob), time.time()))
+            self.evict()
+            self.conn.commit()
+
+    def evict(self):
+        with self._lock:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) from entries;").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            oldest = self.conn.execute("SELECT key, size from entries ORDER BY last_used;").fetchall()
+            for key, size in oldest:
+                if total <= self.max_bytes:
+                    break
+                self.conn.execute("DELETE from entries WHERE key = ?;", (key,))
+                total -= size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE from entries;")
+            self.conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) from entries;").fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': entries, 'bytes': total}
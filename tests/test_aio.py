@@ -0,0 +1,44 @@
+from __future__ import print_function, unicode_literals
+import asyncio
+import gc
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import unittest
+
+from libpxm import aio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'benchmarks'))
+from synth import write_synthetic_pxm
+
+__author__ = 'Ethan Randall'
+
+
+class TestAsync(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.pxm_fp1 = write_synthetic_pxm(os.path.join(self.tmp_dir, 'doc.pxm'), 5, 2, 16)
+        self.runner = aio.AsyncPXMRunner(max_workers=2, max_pending=4)
+
+    def tearDown(self):
+        self.runner.shutdown()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_open_pxm(self):
+        async def names():
+            pxm1 = await aio.open_pxm(self.pxm_fp1, self.runner)
+            return [await pxm1.trait(l, 'PTImageIOFormatLayerNameInfoKey') for l in await pxm1.layers()]
+
+        self.assertEqual(sorted(asyncio.run(names())), ['Layer %d' % i for i in range(5)])
+
+    def test_closed_loops_are_released(self):
+        for _ in range(3):
+            asyncio.run(aio.read_header(self.pxm_fp1, self.runner))
+        gc.collect()
+        self.assertEqual(len(self.runner._semaphores), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+from __future__ import print_function, unicode_literals
+import random
+import unittest
+
+import biplist
+
+from libpxm.archive import NSArchivedPlist, FrozenDict, FrozenList, archive_cache, freeze, thaw
+
+__author__ = 'Ethan Randall'
+
+
+def random_plist(rng, depth=0):
+    """A random value of the kinds dump() supports, with repeated strings and nested containers."""
+    kind = rng.randrange(9 if depth < 4 else 6)
+    if kind == 0:
+        return rng.randint(-2 ** 40, 2 ** 40)
+    if kind == 1:
+        return rng.random() * 1000
+    if kind == 2:
+        return rng.choice(['PTLayerStyleColorKey', 'YES', '', 'gr\u00fc\u00dfe', 'Layer 1'])
+    if kind == 3:
+        return biplist.Data(bytes(bytearray(rng.getrandbits(8) for _ in range(rng.randrange(40)))))
+    if kind == 4:
+        return rng.choice([True, False, None])
+    if kind == 5:
+        return rng.choice([(rng.randint(0, 5000), rng.randint(0, 5000)), ((0, 0), (249, 300.5))])
+    if kind in (6, 7):
+        return dict(('key%d' % rng.randrange(20), random_plist(rng, depth + 1)) for _ in range(rng.randrange(6)))
+    return [random_plist(rng, depth + 1) for _ in range(rng.randrange(6))]
+
+
+def round_trip(plist1):
+    return NSArchivedPlist.load(biplist.readPlistFromString(NSArchivedPlist.dumps(plist1))).real_plist
+
+
+class TestArchiveRoundTrip(unittest.TestCase):
+    def test_random_plists(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            plist1 = {'root': random_plist(rng)}
+            self.assertEqual(round_trip(plist1), plist1)
+
+    def test_shared_and_cyclic_containers(self):
+        shared = ['a', 'b']
+        plist1 = {'x': shared, 'y': shared}
+        plist1['self'] = plist1
+        plist2 = round_trip(plist1)
+        self.assertIs(plist2['x'], plist2['y'])
+        self.assertIs(plist2['self'], plist2)
+
+
+class TestDeepArchives(unittest.TestCase):
+    @staticmethod
+    def nested_arrays(depth):
+        objects = ['$null', {'$classname': 'NSArray', '$classes': ['NSArray', 'NSObject']}]
+        for i in range(depth):
+            objects.append({'NS.objects': [biplist.Uid(len(objects) + 1)] if i < depth - 1 else [],
+                            '$class': biplist.Uid(1)})
+        return {'$archiver': 'NSKeyedArchiver', '$version': 100000, '$top': {'root': biplist.Uid(2)},
+                '$objects': objects}
+
+    def depth(self, plist1):
+        depth = 0
+        while plist1 is not None:
+            depth += 1
+            plist1 = plist1[0] if plist1 else None
+        return depth
+
+    def test_nested_arrays(self):
+        self.assertEqual(self.depth(NSArchivedPlist.load(self.nested_arrays(5000)).real_plist), 5000)
+
+    def test_cached_load(self):
+        plist1 = archive_cache.load(biplist.writePlistToString(self.nested_arrays(5000)))
+        self.assertIsInstance(plist1, FrozenList)
+        self.assertEqual(self.depth(plist1), 5000)
+        self.assertEqual(self.depth(thaw(plist1)), 5000)
+
+
+class TestArchiveTypes(unittest.TestCase):
+    def test_geometry_tuples(self):
+        for geo in [(3, 4.5), ((0, 0), (249, 300.5)), (-1.25, 0)]:
+            self.assertEqual(round_trip({'geo': geo}), {'geo': geo})
+
+    def test_bad_tuples(self):
+        for value in [(), (1,), (1, 2, 3), ('a', 1), (True, 1), ([0, 0], [1, 1]), ((0, 0),), ((0, 0), (1, 'x')),
+                      ((0, 0), 1), ((0, 0, 0), (1, 1, 1))]:
+            with self.assertRaises(TypeError) as cm:
+                NSArchivedPlist.dump({'bad': value})
+            self.assertEqual(str(cm.exception), 'Cannot archive tuple.')
+
+    def test_unsupported_types(self):
+        for value in [set([1]), object(), bytearray(b'x')]:
+            with self.assertRaises(TypeError) as cm:
+                NSArchivedPlist.dump([value])
+            self.assertEqual(str(cm.exception), 'Cannot archive %s.' % type(value).__name__)
+
+
+class TestFrozen(unittest.TestCase):
+    def test_thaw(self):
+        shared = {'stops': [1, 2]}
+        plist1 = freeze({'a': shared, 'b': shared, 'style': {'color': (1, 2)}})
+        with self.assertRaises(TypeError):
+            plist1['style']['color'] = (3, 4)
+        plist2 = thaw(plist1)
+        plist2['style']['color'] = (3, 4)
+        plist2['a']['stops'].append(3)
+        self.assertIs(type(plist2), dict)
+        self.assertIs(plist2['a'], plist2['b'])
+        self.assertEqual(plist1['a']['stops'], [1, 2])
+        self.assertIsInstance(plist1['style'], FrozenDict)
+
+
+if __name__ == '__main__':
+    unittest.main()
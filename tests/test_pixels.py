@@ -0,0 +1,43 @@
+from __future__ import print_function, unicode_literals
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy
+
+from libpxm.document import PXMFileReader
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'benchmarks'))
+from synth import write_synthetic_pxm
+
+__author__ = 'Ethan Randall'
+
+
+class TestPixels(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.pxm_fp1 = write_synthetic_pxm(os.path.join(self.tmp_dir, 'doc.pxm'), 30, 2, 32)
+        self.pxm_fo = PXMFileReader(self.pxm_fp1).pmx_fo
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_pixel_rows(self):
+        l1 = self.pxm_fo.layers[0]
+        bands = [band for y, band in l1.iter_pixel_rows(band_height=5)]
+        self.assertTrue(numpy.array_equal(numpy.concatenate(bands), l1.pixels()))
+        self.assertTrue(numpy.array_equal(l1.pixel_rows(3, 9), l1.pixels()[3:9]))
+
+    def test_flatten_queries(self):
+        statements = []
+        self.pxm_fo.sql_db.conn.set_trace_callback(statements.append)
+        self.pxm_fo.flatten(tile_height=4)
+        # Bitmap rows are read through blobopen() where sqlite3 has it, otherwise with one query per layer band.
+        self.assertLessEqual(len(statements), 10 if hasattr(self.pxm_fo.sql_db.conn, 'blobopen') else 10 + 24 * 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
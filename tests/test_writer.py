@@ -0,0 +1,122 @@
+from __future__ import print_function, unicode_literals
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import unittest
+import zlib
+
+from libpxm.container import PXMContainer
+from libpxm.document import PXMFileReader, PXMFileWriter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'benchmarks'))
+from synth import write_synthetic_pxm
+
+__author__ = 'Ethan Randall'
+
+NAME_KEY = 'PTImageIOFormatLayerNameInfoKey'
+SPECIFIC_KEY = 'PTImageIOFormatLayerSpecificDataInfoKey'
+
+
+class TestWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.pxm_fp1 = write_synthetic_pxm(os.path.join(self.tmp_dir, 'doc.pxm'), 40, 2, 32)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def open(self, pxm_fp1=None):
+        reader1 = PXMFileReader(pxm_fp1 or self.pxm_fp1)
+        return reader1.pmx_fo, PXMFileWriter.from_reader(reader1)
+
+    def assertValid(self, pxm_fp1):
+        """The payload's CRC matches its local header and SQLite finds the database intact."""
+        section1 = PXMContainer(pxm_fp1).sql_section()
+        with open(pxm_fp1, 'rb') as pxm_fd1:
+            pxm_fd1.seek(section1.header_offset)
+            crc = PXMContainer.LOCAL_HEADER.unpack(pxm_fd1.read(PXMContainer.LOCAL_HEADER.size))[6]
+            pxm_fd1.seek(section1.data_offset)
+            self.assertEqual(crc, zlib.crc32(pxm_fd1.read(section1.length)) & 0xFFFFFFFF)
+        pxm_fo = PXMFileReader(pxm_fp1).pmx_fo
+        self.assertEqual(pxm_fo.sql_db.conn.execute('PRAGMA integrity_check;').fetchone()[0], 'ok')
+        return pxm_fo
+
+    def names(self, pxm_fo):
+        return dict((l.uuid, l.traits.get(NAME_KEY)) for l in pxm_fo.layers)
+
+    def test_update_after_update(self):
+        pxm_fo, writer1 = self.open()
+        pxm_fo.layers[0].traits[NAME_KEY] = 'first'
+        writer1.document_info['custom'] = 'one'
+        inode = os.stat(self.pxm_fp1).st_ino
+        writer1.update()
+        pxm_fo.layers[1].traits[NAME_KEY] = 'second'
+        writer1.document_info['custom'] = 'two'
+        writer1.update()
+        self.assertEqual(os.stat(self.pxm_fp1).st_ino, inode)
+
+        pxm_fo2 = self.assertValid(self.pxm_fp1)
+        names = self.names(pxm_fo2)
+        self.assertEqual(names[pxm_fo.layers[0].uuid], 'first')
+        self.assertEqual(names[pxm_fo.layers[1].uuid], 'second')
+        self.assertEqual(pxm_fo2.sql_db.document_info_value('custom'), 'two')
+
+    def test_write_then_update(self):
+        pxm_fo, writer1 = self.open()
+        deleted = [l for l in pxm_fo.layers if SPECIFIC_KEY in l.traits][:20]
+        for l1 in deleted:
+            del l1.traits[SPECIFIC_KEY]
+        copy_fp1 = os.path.join(self.tmp_dir, 'copy.pxm')
+        writer1.write(copy_fp1)
+        pxm_fo.layers[-1].traits['big'] = b'z' * 20000
+        writer1.update()
+
+        for pxm_fp1 in (copy_fp1, self.pxm_fp1):
+            pxm_fo2 = self.assertValid(pxm_fp1)
+            self.assertFalse(any(SPECIFIC_KEY in pxm_fo2.layers_dict[l1.uuid].traits for l1 in deleted))
+        self.assertNotIn('big', PXMFileReader(copy_fp1).pmx_fo.layers_dict[pxm_fo.layers[-1].uuid].traits)
+        self.assertEqual(len(PXMFileReader(self.pxm_fp1).pmx_fo.layers_dict[pxm_fo.layers[-1].uuid].traits['big']),
+                         20000)
+
+    def test_header_growth_uses_padding(self):
+        pxm_fo, writer1 = self.open()
+        pxm_fo.root_plist['padding test'] = 'x' * 100
+        writer1.update()  # the synthetic file has no padding yet, so this rewrites it with some
+        data_offset = writer1.container.sql_section().data_offset
+        inode = os.stat(self.pxm_fp1).st_ino
+
+        pxm_fo.root_plist['padding test'] = 'x' * 1100
+        writer1.update()
+        self.assertEqual(os.stat(self.pxm_fp1).st_ino, inode)
+        self.assertEqual(writer1.container.sql_section().data_offset, data_offset)
+        self.assertValid(self.pxm_fp1)
+        self.assertEqual(PXMFileReader(self.pxm_fp1, header_only=True).pmx_fo.root_plist['padding test'], 'x' * 1100)
+
+        pxm_fo.root_plist['padding test'] = 'x' * (2 * PXMFileWriter.HEADER_PADDING)
+        writer1.update()
+        self.assertValid(self.pxm_fp1)
+
+    def test_growing_payload(self):
+        pxm_fo, writer1 = self.open()
+        old_length = writer1.container.sql_section().length
+        inode = os.stat(self.pxm_fp1).st_ino
+        pxm_fo.layers[2].traits['big'] = b'q' * 300000
+        writer1.update()
+        self.assertEqual(os.stat(self.pxm_fp1).st_ino, inode)
+        self.assertGreater(writer1.container.sql_section().length, old_length)
+        pxm_fo2 = self.assertValid(self.pxm_fp1)
+        self.assertEqual(pxm_fo2.layers_dict[pxm_fo.layers[2].uuid].traits['big'], b'q' * 300000)
+
+    def test_edits_outside_the_layer_tree(self):
+        reader1 = PXMFileReader(self.pxm_fp1, load_layers=False)
+        writer1 = PXMFileWriter.from_reader(reader1)
+        l1 = next(reader1.pmx_fo.iter_layers())
+        l1.traits[NAME_KEY] = 'from iter_layers'
+        writer1.update()
+        self.assertEqual(self.names(self.assertValid(self.pxm_fp1))[l1.uuid], 'from iter_layers')
+
+
+if __name__ == '__main__':
+    unittest.main()